@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
 
 class UserCreate(BaseModel):
     username: str
@@ -9,3 +11,24 @@ class User(BaseModel):
     id: int
     username: str
     email: str
+
+# Upper bound on records per bulk request
+BULK_MAX_ITEMS = 1000
+
+class BulkRegisterRequest(BaseModel):
+    users: List[UserCreate] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+class BulkIdsRequest(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: str
+    user: Optional[User] = None
+    detail: Optional[str] = None
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
@@ -0,0 +1,348 @@
+import bisect
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models import User
+
+
+# Older SQLite builds cap bound parameters per statement at 999
+SQL_VARIABLE_LIMIT = 900
+
+
+class DuplicateEmailError(Exception):
+    pass
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class UserStore(ABC):
+    """Storage backend for users, indexed by id, email and username"""
+
+    @abstractmethod
+    def create(self, username: str, email: str) -> User:
+        """Allocate an id and store a user; raises DuplicateEmailError"""
+
+    @abstractmethod
+    def get(self, user_id: int) -> Optional[User]:
+        pass
+
+    @abstractmethod
+    def get_by_email(self, email: str) -> Optional[User]:
+        pass
+
+    @abstractmethod
+    def find_by_username(self, username: str) -> List[User]:
+        pass
+
+    @abstractmethod
+    def delete(self, user_id: int) -> bool:
+        pass
+
+    def create_many(self, users: Iterable[Tuple[str, str]]) -> List[Optional[User]]:
+        """Create (username, email) pairs in order; None where the email is taken"""
+        created = []
+        for username, email in users:
+            try:
+                created.append(self.create(username, email))
+            except DuplicateEmailError:
+                created.append(None)
+        return created
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, User]:
+        """Users that exist among user_ids, keyed by id"""
+        found = {}
+        for user_id in user_ids:
+            user = self.get(user_id)
+            if user is not None:
+                found[user_id] = user
+        return found
+
+    def delete_many(self, user_ids: Iterable[int]) -> Set[int]:
+        """Delete users and return the ids that existed"""
+        return {user_id for user_id in user_ids if self.delete(user_id)}
+
+    @abstractmethod
+    def list_page(self,
+                  after_id: int = 0,
+                  limit: int = 100,
+                  username_prefix: Optional[str] = None,
+                  email_prefix: Optional[str] = None) -> List[User]:
+        """Up to limit users with id > after_id, in id order, matching the prefixes"""
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+
+class InMemoryUserStore(UserStore):
+    """Dict-backed store; hash indexes make register/get/delete O(1)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._users: Dict[int, User] = {}
+        self._by_email: Dict[str, int] = {}
+        self._by_username: Dict[str, Set[int]] = {}
+        # Ids are allocated in increasing order, so appending keeps this sorted.
+        # Deleted ids stay in place (tombstones) until compaction.
+        self._order: List[int] = []
+        self._tombstones = 0
+
+    def _insert(self, username: str, email: str) -> Optional[User]:
+        # Caller holds the lock
+        if email in self._by_email:
+            return None
+        user = User(id=next(self._ids), username=username, email=email)
+        self._users[user.id] = user
+        self._by_email[email] = user.id
+        self._by_username.setdefault(username, set()).add(user.id)
+        self._order.append(user.id)
+        return user
+
+    def _remove(self, user_id: int) -> bool:
+        # Caller holds the lock
+        user = self._users.pop(user_id, None)
+        if user is None:
+            return False
+        del self._by_email[user.email]
+        usernames = self._by_username[user.username]
+        usernames.discard(user_id)
+        if not usernames:
+            del self._by_username[user.username]
+        # Deleting from the middle of _order would be O(n); rebuild it once
+        # half of it is tombstones, so deletes stay amortized O(1)
+        self._tombstones += 1
+        if self._tombstones > len(self._order) // 2:
+            self._order = [live_id for live_id in self._order if live_id in self._users]
+            self._tombstones = 0
+        return True
+
+    def create(self, username: str, email: str) -> User:
+        with self._lock:
+            user = self._insert(username, email)
+        if user is None:
+            raise DuplicateEmailError(email)
+        return user
+
+    def create_many(self, users: Iterable[Tuple[str, str]]) -> List[Optional[User]]:
+        with self._lock:
+            return [self._insert(username, email) for username, email in users]
+
+    def get(self, user_id: int) -> Optional[User]:
+        return self._users.get(user_id)
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        user_id = self._by_email.get(email)
+        return self._users.get(user_id) if user_id is not None else None
+
+    def find_by_username(self, username: str) -> List[User]:
+        with self._lock:
+            ids = sorted(self._by_username.get(username, ()))
+            return [self._users[user_id] for user_id in ids]
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, User]:
+        users = self._users
+        return {user_id: users[user_id] for user_id in user_ids if user_id in users}
+
+    def delete(self, user_id: int) -> bool:
+        with self._lock:
+            return self._remove(user_id)
+
+    def delete_many(self, user_ids: Iterable[int]) -> Set[int]:
+        with self._lock:
+            return {user_id for user_id in user_ids if self._remove(user_id)}
+
+    def list_page(self,
+                  after_id: int = 0,
+                  limit: int = 100,
+                  username_prefix: Optional[str] = None,
+                  email_prefix: Optional[str] = None) -> List[User]:
+        page = []
+        with self._lock:
+            start = bisect.bisect_right(self._order, after_id)
+            for index in range(start, len(self._order)):
+                user = self._users.get(self._order[index])
+                if user is None:
+                    continue
+                if username_prefix and not user.username.startswith(username_prefix):
+                    continue
+                if email_prefix and not user.email.startswith(email_prefix):
+                    continue
+                page.append(user)
+                if len(page) >= limit:
+                    break
+        return page
+
+    def count(self) -> int:
+        return len(self._users)
+
+
+class SQLiteUserStore(UserStore):
+    """SQLite store with unique/secondary indexes and a connection pool"""
+
+    def __init__(self, path: str = "users.sqlite3", pool_size: int = 8):
+        # A ":memory:" database is private to its connection, so share one
+        uri = path.startswith("file:")
+        if path == ":memory:":
+            pool_size = 1
+
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            conn = sqlite3.connect(path, uri=uri, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._pool.put(conn)
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " username TEXT NOT NULL,"
+                " email TEXT NOT NULL UNIQUE)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS users_username ON users (username)")
+
+    @contextmanager
+    def _connection(self):
+        conn = self._pool.get()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._pool.put(conn)
+
+    @staticmethod
+    def _to_user(row) -> Optional[User]:
+        if row is None:
+            return None
+        return User(id=row[0], username=row[1], email=row[2])
+
+    def create(self, username: str, email: str) -> User:
+        try:
+            with self._connection() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO users (username, email) VALUES (?, ?)", (username, email)
+                )
+                return User(id=cursor.lastrowid, username=username, email=email)
+        except sqlite3.IntegrityError:
+            raise DuplicateEmailError(email)
+
+    def create_many(self, users: Iterable[Tuple[str, str]]) -> List[Optional[User]]:
+        # One transaction for the whole batch; OR IGNORE skips taken emails
+        created = []
+        with self._connection() as conn:
+            for username, email in users:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO users (username, email) VALUES (?, ?)", (username, email)
+                )
+                created.append(
+                    User(id=cursor.lastrowid, username=username, email=email) if cursor.rowcount else None
+                )
+        return created
+
+    def get(self, user_id: int) -> Optional[User]:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT id, username, email FROM users WHERE id = ?", (user_id,)
+            ).fetchone()
+        return self._to_user(row)
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT id, username, email FROM users WHERE email = ?", (email,)
+            ).fetchone()
+        return self._to_user(row)
+
+    def find_by_username(self, username: str) -> List[User]:
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT id, username, email FROM users WHERE username = ? ORDER BY id", (username,)
+            ).fetchall()
+        return [self._to_user(row) for row in rows]
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, User]:
+        found = {}
+        with self._connection() as conn:
+            for chunk in _chunks(list(dict.fromkeys(user_ids)), SQL_VARIABLE_LIMIT):
+                rows = conn.execute(
+                    f"SELECT id, username, email FROM users WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for row in rows:
+                    found[row[0]] = self._to_user(row)
+        return found
+
+    def delete(self, user_id: int) -> bool:
+        with self._connection() as conn:
+            cursor = conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+        return cursor.rowcount > 0
+
+    def delete_many(self, user_ids: Iterable[int]) -> Set[int]:
+        deleted = set()
+        with self._connection() as conn:
+            for chunk in _chunks(list(dict.fromkeys(user_ids)), SQL_VARIABLE_LIMIT):
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT id FROM users WHERE id IN ({placeholders})", chunk).fetchall()
+                conn.execute(f"DELETE FROM users WHERE id IN ({placeholders})", chunk)
+                deleted.update(row[0] for row in rows)
+        return deleted
+
+    def list_page(self,
+                  after_id: int = 0,
+                  limit: int = 100,
+                  username_prefix: Optional[str] = None,
+                  email_prefix: Optional[str] = None) -> List[User]:
+        # Prefixes become index-friendly range conditions
+        sql = "SELECT id, username, email FROM users WHERE id > ?"
+        params: list = [after_id]
+        for column, prefix in (("username", username_prefix), ("email", email_prefix)):
+            if prefix:
+                sql += f" AND {column} >= ? AND {column} < ?"
+                params += [prefix, prefix + "\U0010ffff"]
+        sql += " ORDER BY id LIMIT ?"
+        params.append(limit)
+
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [self._to_user(row) for row in rows]
+
+    def count(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+
+def create_store() -> UserStore:
+    """Build the backend selected by USER_STORE_BACKEND (memory or sqlite)"""
+    backend = os.environ.get("USER_STORE_BACKEND", "memory")
+    if backend == "sqlite":
+        return SQLiteUserStore(
+            path=os.environ.get("USER_DB_PATH", "users.sqlite3"),
+            pool_size=int(os.environ.get("USER_DB_POOL_SIZE", "8")),
+        )
+    if backend == "memory":
+        return InMemoryUserStore()
+    raise ValueError(f"Unknown USER_STORE_BACKEND: {backend}")
+
+
+_store: Optional[UserStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> UserStore:
+    """FastAPI dependency returning the process-wide store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_store()
+    return _store
@@ -1,37 +1,138 @@
-from fastapi import APIRouter, HTTPException
-from models import UserCreate, User
+import hashlib
+import json
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from models import BulkIdsRequest, BulkItemResult, BulkRegisterRequest, BulkResult, UserCreate, User
+from storage import DuplicateEmailError, UserStore, get_store
 
 router = APIRouter()
 
-# In-memory user store for demo purposes
-users_db = {}
-user_id_counter = 1
+USER_FIELDS = ("id", "username", "email")
+STREAM_PAGE_SIZE = 500
+
+
+class UserPage(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[int] = None
+
+
+def _parse_fields(fields: Optional[str]) -> tuple:
+    if not fields:
+        return USER_FIELDS
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in selected if field not in USER_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+
+def _project(user: User, fields: tuple) -> Dict[str, Any]:
+    return {field: getattr(user, field) for field in fields}
+
+
+def _conditional_response(request: Request, payload: Any) -> Response:
+    """JSON response with a content-hash ETag; 304 if the client already has it"""
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    if_none_match = request.headers.get("if-none-match", "")
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = {tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()
+                  for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 @router.post("/register", response_model=User)
-def register_user(user: UserCreate):
-    global user_id_counter
-    for u in users_db.values():
-        if u.email == user.email:
-            raise HTTPException(status_code=400, detail="Email already registered")
-    new_user = User(id=user_id_counter, username=user.username, email=user.email)
-    users_db[user_id_counter] = new_user
-    user_id_counter += 1
-    return new_user
+def register_user(user: UserCreate, store: UserStore = Depends(get_store)):
+    try:
+        return store.create(user.username, user.email)
+    except DuplicateEmailError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+def _bulk_result(results: List[BulkItemResult], ok_status: str) -> BulkResult:
+    succeeded = sum(1 for result in results if result.status == ok_status)
+    return BulkResult(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+@router.post("/bulk-register", response_model=BulkResult)
+def bulk_register_users(request: BulkRegisterRequest, store: UserStore = Depends(get_store)):
+    """Register many users in one call; a taken email fails only its own item"""
+    created = store.create_many((user.username, user.email) for user in request.users)
+    results = [
+        BulkItemResult(index=index, id=user.id, status="created", user=user) if user
+        else BulkItemResult(index=index, status="error", detail="Email already registered")
+        for index, user in enumerate(created)
+    ]
+    return _bulk_result(results, "created")
+
+@router.post("/bulk-get", response_model=BulkResult)
+def bulk_get_users(request: BulkIdsRequest, store: UserStore = Depends(get_store)):
+    found = store.get_many(request.ids)
+    results = [
+        BulkItemResult(index=index, id=user_id, status="found", user=found[user_id]) if user_id in found
+        else BulkItemResult(index=index, id=user_id, status="error", detail="User not found")
+        for index, user_id in enumerate(request.ids)
+    ]
+    return _bulk_result(results, "found")
+
+@router.post("/bulk-delete", response_model=BulkResult)
+def bulk_delete_users(request: BulkIdsRequest, store: UserStore = Depends(get_store)):
+    deleted = store.delete_many(request.ids)
+    results = []
+    reported = set()
+    for index, user_id in enumerate(request.ids):
+        # A repeated id is only deleted once
+        if user_id in deleted and user_id not in reported:
+            reported.add(user_id)
+            results.append(BulkItemResult(index=index, id=user_id, status="deleted"))
+        else:
+            results.append(BulkItemResult(index=index, id=user_id, status="error", detail="User not found"))
+    return _bulk_result(results, "deleted")
 
 @router.get("/{user_id}", response_model=User)
-def get_user(user_id: int):
-    user = users_db.get(user_id)
+def get_user(user_id: int, request: Request, store: UserStore = Depends(get_store)):
+    user = store.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return _conditional_response(request, _project(user, USER_FIELDS))
+
+@router.get("/", response_model=UserPage)
+def list_users(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: int = Query(0, ge=0, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of id,username,email"),
+    username_prefix: Optional[str] = None,
+    email_prefix: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    store: UserStore = Depends(get_store),
+):
+    selected = _parse_fields(fields)
+
+    if format == "ndjson":
+        # Every matching user after the cursor, one page in memory at a time
+        def stream():
+            after_id = cursor
+            while True:
+                page = store.list_page(after_id, STREAM_PAGE_SIZE, username_prefix, email_prefix)
+                for user in page:
+                    yield json.dumps(_project(user, selected)) + "\n"
+                if len(page) < STREAM_PAGE_SIZE:
+                    break
+                after_id = page[-1].id
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-@router.get("/", response_model=list[User])
-def list_users():
-    return list(users_db.values())
+    page = store.list_page(cursor, limit, username_prefix, email_prefix)
+    next_cursor = page[-1].id if len(page) == limit else None
+    return _conditional_response(
+        request, {"items": [_project(user, selected) for user in page], "next_cursor": next_cursor}
+    )
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int):
-    if user_id in users_db:
-        del users_db[user_id]
+def delete_user(user_id: int, store: UserStore = Depends(get_store)):
+    if store.delete(user_id):
         return {"detail": "User deleted"}
     raise HTTPException(status_code=404, detail="User not found")
@@ -0,0 +1,430 @@
+"""
+Latency and throughput benchmark for the user management stack
+
+Starts the User Management API and the MCP server locally, seeds users,
+then drives register/get/list/delete at a fixed concurrency through:
+
+- rest: HTTP calls straight to the API
+- mcp: MCP tool calls to user-tools.py (FastMCP) over SSE (tool wrapper,
+  pooled client and response cache included)
+- mcp-fastapi: MCP tool calls to user-tools-mcp.py (FastApiMCP) over SSE;
+  it has no single-user get/delete tools, so those go through
+  bulk_get_users/bulk_delete_users with one id
+
+Results can be saved as a JSON baseline and later runs compared to it.
+
+Run from the MCP directory in an environment with the API and MCP server
+dependencies installed:
+
+    python benchmarks/bench_users.py --users 100000 --concurrency 32
+    python benchmarks/bench_users.py --save-baseline benchmarks/baselines/local.json
+    python benchmarks/bench_users.py --compare benchmarks/baselines/local.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import AsyncExitStack, contextmanager
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+
+MCP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(MCP_DIR, "API", "user_management")
+MCP_SERVER_DIR = os.path.join(MCP_DIR, "user-mgmt-mcpserver")
+
+OPERATIONS = ("register", "get", "list", "delete")
+TARGETS = ("rest", "mcp", "mcp-fastapi")
+# uvicorn arguments and SSE endpoint of each MCP front-end
+MCP_SERVERS = {
+    "mcp": (["user-tools:app", "--factory"], "/sse"),
+    "mcp-fastapi": (["user-tools-mcp:app"], "/mcp"),
+}
+SEED_BATCH_SIZE = 1000
+LIST_PAGE_SIZE = 50
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles (milliseconds) for one operation"""
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+async def drive(call: Callable[[int], Awaitable[Any]], count: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Run call(0..count-1) with at most `concurrency` calls in flight
+
+    Returns:
+        Summary of latencies and errors
+    """
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < count:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                await call(index)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+class RestTarget:
+    """Direct HTTP calls to the User Management API"""
+
+    name = "rest"
+
+    def __init__(self, api_url: str, concurrency: int):
+        self.client = httpx.AsyncClient(
+            base_url=api_url,
+            timeout=30,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+
+    async def register(self, username: str, email: str) -> int:
+        response = await self.client.post(
+            "/users/register", json={"username": username, "email": email, "password": "bench"}
+        )
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def get(self, user_id: int):
+        response = await self.client.get(f"/users/{user_id}")
+        response.raise_for_status()
+
+    async def list(self, cursor: int):
+        response = await self.client.get("/users/", params={"limit": LIST_PAGE_SIZE, "cursor": cursor})
+        response.raise_for_status()
+
+    async def delete(self, user_id: int):
+        response = await self.client.delete(f"/users/{user_id}")
+        response.raise_for_status()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class MCPTarget:
+    """MCP tool calls to the FastMCP server, one client session per concurrent worker"""
+
+    name = "mcp"
+
+    def __init__(self, mcp_url: str, concurrency: int):
+        self.mcp_url = mcp_url
+        self.concurrency = concurrency
+        self.sessions = []
+        self._stack = AsyncExitStack()
+        self._next = 0
+
+    async def connect(self):
+        from mcp import ClientSession
+        from mcp.client.sse import sse_client
+
+        for _ in range(self.concurrency):
+            read, write = await self._stack.enter_async_context(sse_client(self.mcp_url))
+            session = await self._stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            self.sessions.append(session)
+
+    async def _call(self, tool: str, arguments: dict) -> Any:
+        # Round-robin keeps every session (and its SSE stream) busy
+        session = self.sessions[self._next % len(self.sessions)]
+        self._next += 1
+        result = await session.call_tool(tool, arguments)
+        if result.isError:
+            raise RuntimeError(result.content[0].text if result.content else tool)
+        return json.loads(result.content[0].text) if result.content else None
+
+    async def register(self, username: str, email: str) -> int:
+        user = await self._call("register_user", {"username": username, "email": email, "password": "bench"})
+        return user["id"]
+
+    async def get(self, user_id: int):
+        await self._call("get_user", {"user_id": user_id})
+
+    async def list(self, cursor: int):
+        await self._call("list_users", {"limit": LIST_PAGE_SIZE, "cursor": cursor})
+
+    async def delete(self, user_id: int):
+        await self._call("delete_user", {"user_id": user_id})
+
+    async def close(self):
+        await self._stack.aclose()
+
+
+class FastApiMCPTarget(MCPTarget):
+    """MCP tool calls to the FastApiMCP server (user-tools-mcp.py)"""
+
+    name = "mcp-fastapi"
+
+    async def _call(self, tool: str, arguments: dict) -> Any:
+        body = await super()._call(tool, arguments)
+        # The endpoints report failures in the body instead of a tool error
+        if isinstance(body, dict) and "error" in body:
+            raise RuntimeError(body["error"])
+        return body
+
+    async def list(self, cursor: int):
+        await self._call("getUsers", {"limit": LIST_PAGE_SIZE, "cursor": cursor})
+
+    async def get(self, user_id: int):
+        await self._call("bulk_get_users", {"user_ids": [user_id]})
+
+    async def delete(self, user_id: int):
+        await self._call("bulk_delete_users", {"user_ids": [user_id]})
+
+
+async def seed(api_url: str, users: int, concurrency: int, run_id: str) -> List[int]:
+    """Bulk-register users through the API and return their ids"""
+    ids: List[int] = []
+    async with httpx.AsyncClient(base_url=api_url, timeout=120) as client:
+        async def register_batch(batch: int):
+            start = batch * SEED_BATCH_SIZE
+            payload = [
+                {"username": f"seed{i}", "email": f"seed-{run_id}-{i}@example.com", "password": "bench"}
+                for i in range(start, min(start + SEED_BATCH_SIZE, users))
+            ]
+            response = await client.post("/users/bulk-register", json={"users": payload})
+            response.raise_for_status()
+            ids.extend(result["id"] for result in response.json()["results"] if result["id"] is not None)
+
+        batches = (users + SEED_BATCH_SIZE - 1) // SEED_BATCH_SIZE
+        await drive(register_batch, batches, min(concurrency, 8))
+    ids.sort()
+    return ids
+
+
+async def run_target(target, seeded_ids: List[int], requests: int, concurrency: int, run_id: str) -> Dict[str, Any]:
+    """Run every operation against one target"""
+    rng = random.Random(0)
+    created: List[int] = []
+    results = {}
+
+    async def register(index: int):
+        created.append(await target.register(f"user{index}", f"{target.name}-{run_id}-{index}@example.com"))
+
+    get_ids = [rng.choice(seeded_ids) for _ in range(requests)]
+    cursors = [rng.choice(seeded_ids) - 1 for _ in range(requests)]
+
+    results["register"] = await drive(register, requests, concurrency)
+    results["get"] = await drive(lambda i: target.get(get_ids[i]), requests, concurrency)
+    results["list"] = await drive(lambda i: target.list(cursors[i]), requests, concurrency)
+    results["delete"] = await drive(lambda i: target.delete(created[i]), len(created), concurrency)
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Server did not listen on port {port} within {timeout}s")
+
+
+@contextmanager
+def servers(backend: str, mcp_targets: List[str]):
+    """Start the API and the given MCP servers on free ports; yields (api_url, {target: mcp_url})"""
+    processes = []
+    tmpdir = tempfile.TemporaryDirectory()
+    try:
+        api_port = free_port()
+        api_env = {**os.environ, "USER_STORE_BACKEND": backend,
+                   "USER_DB_PATH": os.path.join(tmpdir.name, "users.sqlite3")}
+        api = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(api_port), "--log-level", "warning"],
+            cwd=API_DIR, env=api_env
+        )
+        processes.append(api)
+        wait_for_port(api_port, api)
+        api_url = f"http://127.0.0.1:{api_port}"
+
+        mcp_urls = {}
+        for target in mcp_targets:
+            app_args, sse_path = MCP_SERVERS[target]
+            mcp_port = free_port()
+            mcp = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", *app_args,
+                 "--port", str(mcp_port), "--log-level", "warning"],
+                cwd=MCP_SERVER_DIR, env={**os.environ, "USER_API_BASE_URL": api_url}
+            )
+            processes.append(mcp)
+            wait_for_port(mcp_port, mcp)
+            mcp_urls[target] = f"http://127.0.0.1:{mcp_port}{sse_path}"
+
+        yield api_url, mcp_urls
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        tmpdir.cleanup()
+
+
+async def benchmark(args, api_url: str, mcp_urls: Dict[str, str]) -> Dict[str, Any]:
+    run_id = uuid.uuid4().hex[:8]
+
+    started = time.perf_counter()
+    seeded_ids = await seed(api_url, args.users, args.concurrency, run_id)
+    print(f"Seeded {len(seeded_ids)} users in {time.perf_counter() - started:.1f}s")
+
+    results = {}
+    for name in args.targets:
+        if name == "rest":
+            target = RestTarget(api_url, args.concurrency)
+        else:
+            target_class = FastApiMCPTarget if name == "mcp-fastapi" else MCPTarget
+            target = target_class(mcp_urls[name], args.concurrency)
+            await target.connect()
+        try:
+            results[name] = await run_target(target, seeded_ids, args.requests, args.concurrency, run_id)
+        finally:
+            await target.close()
+        print_results(name, results[name])
+
+    return {
+        "config": {
+            "users": args.users,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "backend": args.backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def print_results(target: str, results: Dict[str, Any]):
+    print(f"\n[{target}]")
+    print(f"{'operation':<10}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for operation in OPERATIONS:
+        stats = results[operation]
+        print(f"{operation:<10}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>10}"
+              f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Find regressions against a baseline
+
+    Args:
+        tolerance: Allowed relative slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        One message per regressed metric
+    """
+    regressions = []
+    for target, operations in report["results"].items():
+        for operation, stats in operations.items():
+            base = baseline.get("results", {}).get(target, {}).get(operation)
+            if not base:
+                continue
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                if base[metric] and stats[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(f"{target}/{operation} {metric}: {base[metric]} -> {stats[metric]}")
+            if base["throughput_rps"] and stats["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{target}/{operation} throughput_rps: {base['throughput_rps']} -> {stats['throughput_rps']}"
+                )
+            if stats["errors"] > base["errors"]:
+                regressions.append(f"{target}/{operation} errors: {base['errors']} -> {stats['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="User API / MCP latency benchmark")
+    parser.add_argument("--users", type=int, default=10_000, help="Users seeded before measuring (1k-1M)")
+    parser.add_argument("--requests", type=int, default=2_000, help="Requests per operation and target")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=list(TARGETS))
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory",
+                        help="USER_STORE_BACKEND for the API server")
+    parser.add_argument("--api-url", help="Benchmark an already running API instead of starting one")
+    parser.add_argument("--mcp-url", help="SSE URL of an already running FastMCP server (with --api-url)")
+    parser.add_argument("--mcp-fastapi-url", help="SSE URL of an already running FastApiMCP server (with --api-url)")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--save-baseline", help="Write the report as a baseline JSON file")
+    parser.add_argument("--compare", help="Baseline JSON to compare against; exits 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown (default 20%%)")
+    args = parser.parse_args()
+
+    mcp_targets = [target for target in args.targets if target in MCP_SERVERS]
+    if args.api_url:
+        mcp_urls = {"mcp": args.mcp_url, "mcp-fastapi": args.mcp_fastapi_url}
+        for target in mcp_targets:
+            if not mcp_urls[target]:
+                parser.error(f"--{target}-url is required for the {target} target with --api-url")
+        report = asyncio.run(benchmark(args, args.api_url, mcp_urls))
+    else:
+        with servers(args.backend, mcp_targets) as (api_url, mcp_urls):
+            report = asyncio.run(benchmark(args, api_url, mcp_urls))
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config", {}).get("users") != args.users:
+            print("Warning: baseline was recorded with a different --users")
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+TTL- and size-bounded cache for API GET responses
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class ResponseCache:
+    """LRU cache of decoded response bodies with their ETags
+
+    Entries stay fresh for ttl seconds. Stale entries are kept (until
+    evicted) so their ETag can be used to revalidate with If-None-Match.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Least recently used entries are evicted beyond this
+            ttl: Seconds an entry is served without asking the API
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+
+        self._entries: "OrderedDict[Hashable, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a read that raced a write is not stored
+        self.generation = 0
+
+    @staticmethod
+    def key(path: str, params: Optional[dict] = None) -> Tuple[str, tuple]:
+        return path, tuple(sorted((params or {}).items()))
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[Any], Optional[str]]:
+        """
+        Find a cached response
+
+        Returns:
+            (body, None) for a fresh hit, (None, etag) for a stale entry that
+            can be revalidated, (None, None) on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if time.monotonic() < entry["expires_at"]:
+                self.hits += 1
+                return entry["body"], None
+            self.misses += 1
+            return None, entry["etag"]
+
+    def store(self, key: Hashable, body: Any, etag: Optional[str], generation: int):
+        """Cache a response read while the cache was at the given generation"""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = {"body": body, "etag": etag, "expires_at": time.monotonic() + self.ttl}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def refresh(self, key: Hashable, generation: int) -> Optional[Any]:
+        """Mark a stale entry fresh after a 304 and return its body"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or generation != self.generation:
+                return None
+            entry["expires_at"] = time.monotonic() + self.ttl
+            self.revalidated += 1
+            return entry["body"]
+
+    def invalidate(self, paths: Iterable[str]):
+        """Drop every entry for these paths, whatever their query parameters"""
+        paths = set(paths)
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if key[0] in paths]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+            }
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_api_client import UserAPIClient  # noqa: E402
+
+USER = {"id": 1, "username": "ada", "email": "ada@example.com"}
+ETAG = 'W/"user-1"'
+
+
+def make_client(handler, **kwargs):
+    return UserAPIClient(base_url="http://api.test", transport=httpx.MockTransport(handler),
+                         backoff_seconds=0, **kwargs)
+
+
+def expire(client):
+    for entry in client.cache._entries.values():
+        entry["expires_at"] = 0
+
+
+def test_stale_entry_is_revalidated_with_304():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == ETAG:
+            return httpx.Response(304, headers={"ETag": ETAG})
+        return httpx.Response(200, json=USER, headers={"ETag": ETAG})
+
+    async def scenario():
+        client = make_client(handler)
+        try:
+            assert await client.get("/users/1") == USER
+            expire(client)
+            assert await client.get("/users/1") == USER
+            # Refreshed by the 304: served from the cache again
+            assert await client.get("/users/1") == USER
+            return client.cache.stats()
+        finally:
+            await client.aclose()
+
+    stats = asyncio.run(scenario())
+    assert len(requests) == 2
+    assert "If-None-Match" not in requests[0].headers
+    assert requests[1].headers["If-None-Match"] == ETAG
+    assert stats["revalidated"] == 1
+    assert stats["hits"] == 1
+
+
+def test_changed_resource_replaces_stale_entry():
+    versions = iter([("v1", "alice"), ("v2", "alice2")])
+    current = {}
+
+    def handler(request):
+        if "If-None-Match" in request.headers and request.headers["If-None-Match"] == current["etag"]:
+            return httpx.Response(304)
+        etag, username = next(versions)
+        current["etag"] = etag
+        return httpx.Response(200, json={**USER, "username": username}, headers={"ETag": etag})
+
+    async def scenario():
+        client = make_client(handler)
+        try:
+            first = await client.get("/users/1")
+            current["etag"] = "changed"
+            expire(client)
+            second = await client.get("/users/1")
+            return first, second
+        finally:
+            await client.aclose()
+
+    first, second = asyncio.run(scenario())
+    assert first["username"] == "alice"
+    assert second["username"] == "alice2"
+
+
+def test_error_status_still_raises():
+    def handler(request):
+        return httpx.Response(404, json={"detail": "User not found"})
+
+    async def scenario():
+        client = make_client(handler)
+        try:
+            await client.get("/users/9")
+        finally:
+            await client.aclose()
+
+    try:
+        asyncio.run(scenario())
+    except httpx.HTTPStatusError as e:
+        assert e.response.status_code == 404
+    else:
+        raise AssertionError("404 did not raise")
+
+
+def test_bulk_keeps_results_of_chunks_that_succeeded():
+    def handler(request):
+        ids = json.loads(request.content)["ids"]
+        if 500 in ids:
+            return httpx.Response(503)
+        return httpx.Response(200, json={
+            "succeeded": len(ids),
+            "failed": 0,
+            "results": [{"index": i, "id": user_id, "status": "deleted"} for i, user_id in enumerate(ids)],
+        })
+
+    async def scenario():
+        client = make_client(handler)
+        try:
+            return await client.bulk("/users/bulk-delete", "ids", list(range(1200)), idempotent=False)
+        finally:
+            await client.aclose()
+
+    result = asyncio.run(scenario())
+    assert result["succeeded"] == 700
+    assert result["failed"] == 500
+    assert [item["index"] for item in result["results"]] == list(range(1200))
+    assert all(item["status"] == "error" for item in result["results"][500:1000])
+    assert result["results"][600]["id"] == 600
+    assert result["results"][1100]["status"] == "deleted"
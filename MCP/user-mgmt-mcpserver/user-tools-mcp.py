@@ -1,37 +1,89 @@
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import Body, FastAPI
 from fastapi_mcp import FastApiMCP
-import requests
-app = FastAPI()
+from pydantic import BaseModel
+
+from user_api_client import get_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await get_client().aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 import traceback
 
-@app.get("/users", operation_id="getUsers", summary="this tool will give you all users")
-def list_users() -> list:
+
+class NewUser(BaseModel):
+    username: str
+    email: str
+    password: str
+
+
+@app.get("/users", operation_id="getUsers", summary="this tool will give you one page of users; pass next_cursor back as cursor for the next page")
+async def list_users(limit: int = 50,
+                     cursor: int | None = None,
+                     fields: str | None = None,
+                     username_prefix: str | None = None,
+                     email_prefix: str | None = None) -> dict:
     try:
-        url = "http://localhost:8000/users/"
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+        return await get_client().get("/users/", params={
+            "limit": limit,
+            "cursor": cursor,
+            "fields": fields,
+            "username_prefix": username_prefix,
+            "email_prefix": email_prefix,
+        })
     except Exception as e:
         print("Exception occurred:", e)
         print(traceback.format_exc())
         return {"error": str(e), "traceback": traceback.format_exc()}
 
 @app.post("/users/register", operation_id="register_user", summary="this tool is used to register user")
-def register_user(username: str, email: str, password: str) -> dict:
+async def register_user(username: str, email: str, password: str) -> dict:
     try:
         """Register a new user via POST /users/register"""
-        url = "http://localhost:8000/users/register"
         payload = {"username": username, "email": email, "password": password}
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()
+        return await get_client().post("/users/register", json=payload, invalidates=["/users/"])
+    except Exception as e:
+        print("Exception occurred:", e)
+        print(traceback.format_exc())
+        return {"error": str(e), "traceback": traceback.format_exc()}
+
+@app.post("/users/bulk-register", operation_id="bulk_register_users", summary="this tool registers many users in one call and returns a result per user")
+async def bulk_register_users(users: list[NewUser] = Body(embed=True)) -> dict:
+    try:
+        return await get_client().bulk(
+            "/users/bulk-register", "users", [user.model_dump() for user in users], invalidates=["/users/"]
+        )
+    except Exception as e:
+        print("Exception occurred:", e)
+        print(traceback.format_exc())
+        return {"error": str(e), "traceback": traceback.format_exc()}
+
+@app.post("/users/bulk-get", operation_id="bulk_get_users", summary="this tool gets many users by id in one call")
+async def bulk_get_users(user_ids: list[int] = Body(embed=True)) -> dict:
+    try:
+        return await get_client().bulk("/users/bulk-get", "ids", user_ids, idempotent=True)
+    except Exception as e:
+        print("Exception occurred:", e)
+        print(traceback.format_exc())
+        return {"error": str(e), "traceback": traceback.format_exc()}
+
+@app.post("/users/bulk-delete", operation_id="bulk_delete_users", summary="this tool deletes many users by id in one call")
+async def bulk_delete_users(user_ids: list[int] = Body(embed=True)) -> dict:
+    try:
+        return await get_client().bulk(
+            "/users/bulk-delete", "ids", user_ids,
+            invalidates=["/users/", *(f"/users/{user_id}" for user_id in user_ids)]
+        )
     except Exception as e:
         print("Exception occurred:", e)
         print(traceback.format_exc())
         return {"error": str(e), "traceback": traceback.format_exc()}
-    
 
 
 mcp = FastApiMCP(app, name="User MCP", description="Simple application to do user management")
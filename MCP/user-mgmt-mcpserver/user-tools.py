@@ -1,41 +1,67 @@
 # hello_mcp.py
 from mcp.server.fastmcp import FastMCP
-import requests
+
+from user_api_client import get_client
 
 mcp = FastMCP("UserMCP")
 
 @mcp.tool()
-def register_user(username: str, email: str, password: str) -> dict:
+async def register_user(username: str, email: str, password: str) -> dict:
     """Register a new user via POST /users/register"""
-    url = "http://localhost:8000/users/register"
     payload = {"username": username, "email": email, "password": password}
-    response = requests.post(url, json=payload)
-    response.raise_for_status()
-    return response.json()
+    return await get_client().post("/users/register", json=payload, invalidates=["/users/"])
 
 @mcp.tool()
-def get_user(user_id: int) -> dict:
-    """Get a user by ID via GET /users/{user_id}"""
-    url = f"http://localhost:8000/users/{user_id}"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+async def get_user(user_id: int) -> dict:
+    """Get a user by ID via GET /users/{user_id} (cached briefly)"""
+    return await get_client().get(f"/users/{user_id}")
 
 @mcp.tool()
-def delete_user(user_id: int) -> dict:
+async def delete_user(user_id: int) -> dict:
     """Delete a user by ID via DELETE /users/{user_id}"""
-    url = f"http://localhost:8000/users/{user_id}"
-    response = requests.delete(url)
-    response.raise_for_status()
-    return response.json()
+    return await get_client().delete(f"/users/{user_id}", invalidates=["/users/"])
 
 @mcp.tool()
-def list_users() -> list:
-    """List all users via GET /users/"""
-    url = "http://localhost:8000/users/"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+async def bulk_register_users(users: list[dict]) -> dict:
+    """Register many users via POST /users/bulk-register
+
+    users is a list of {"username", "email", "password"} objects. Returns
+    succeeded/failed counts and one result per input, in input order.
+    """
+    return await get_client().bulk("/users/bulk-register", "users", users, invalidates=["/users/"])
+
+@mcp.tool()
+async def bulk_get_users(user_ids: list[int]) -> dict:
+    """Get many users by ID via POST /users/bulk-get"""
+    return await get_client().bulk("/users/bulk-get", "ids", user_ids, idempotent=True)
+
+@mcp.tool()
+async def bulk_delete_users(user_ids: list[int]) -> dict:
+    """Delete many users by ID via POST /users/bulk-delete"""
+    return await get_client().bulk(
+        "/users/bulk-delete", "ids", user_ids,
+        invalidates=["/users/", *(f"/users/{user_id}" for user_id in user_ids)]
+    )
+
+@mcp.tool()
+async def list_users(limit: int = 50,
+                     cursor: int | None = None,
+                     fields: str | None = None,
+                     username_prefix: str | None = None,
+                     email_prefix: str | None = None) -> dict:
+    """List users one page at a time via GET /users/ (cached briefly)
+
+    Returns {"items": [...], "next_cursor": ...}; pass next_cursor back as
+    cursor for the next page (null means no more pages). fields is a
+    comma-separated subset of id,username,email.
+    """
+    return await get_client().get("/users/", params={
+        "limit": limit,
+        "cursor": cursor,
+        "fields": fields,
+        "username_prefix": username_prefix,
+        "email_prefix": email_prefix,
+    })
 
 # ✅ expose SSE app for uvicorn
 app = mcp.sse_app
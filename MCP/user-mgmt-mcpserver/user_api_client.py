@@ -0,0 +1,248 @@
+"""
+Shared async client for the User Management API
+
+One pooled httpx.AsyncClient per process: connections are kept alive
+between tool calls, every request has a timeout, transient failures are
+retried with exponential backoff and a semaphore caps requests in flight.
+GET responses are cached for a short TTL and revalidated with their ETag;
+writes made through the client invalidate the affected entries.
+"""
+import asyncio
+import os
+import random
+from typing import Any, Iterable, Optional
+
+import httpx
+
+from response_cache import ResponseCache
+
+API_BASE_URL = os.environ.get("USER_API_BASE_URL", "http://localhost:8000")
+API_TIMEOUT = float(os.environ.get("USER_API_TIMEOUT", "10"))
+API_MAX_CONNECTIONS = int(os.environ.get("USER_API_MAX_CONNECTIONS", "100"))
+API_MAX_CONCURRENCY = int(os.environ.get("USER_API_MAX_CONCURRENCY", "64"))
+API_MAX_RETRIES = int(os.environ.get("USER_API_MAX_RETRIES", "3"))
+API_BACKOFF_SECONDS = float(os.environ.get("USER_API_BACKOFF_SECONDS", "0.2"))
+API_CACHE_TTL = float(os.environ.get("USER_API_CACHE_TTL", "30"))
+API_CACHE_SIZE = int(os.environ.get("USER_API_CACHE_SIZE", "1024"))
+
+# Records per bulk request; the API accepts up to 1000
+BULK_CHUNK_SIZE = 500
+
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+class UserAPIClient:
+    """Async client for the User Management API with pooling, retries and a concurrency cap"""
+
+    def __init__(self,
+                 base_url: str = API_BASE_URL,
+                 timeout: float = API_TIMEOUT,
+                 max_connections: int = API_MAX_CONNECTIONS,
+                 max_concurrency: int = API_MAX_CONCURRENCY,
+                 max_retries: int = API_MAX_RETRIES,
+                 backoff_seconds: float = API_BACKOFF_SECONDS,
+                 cache_ttl: float = API_CACHE_TTL,
+                 cache_size: int = API_CACHE_SIZE,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialize the client
+
+        Args:
+            base_url: API root URL
+            timeout: Per-request timeout in seconds (connect, read, write and pool)
+            max_connections: Size of the keep-alive connection pool
+            max_concurrency: Requests allowed in flight at once
+            max_retries: Retries after the first attempt for transient failures
+            backoff_seconds: Base delay, doubled on every retry (with jitter)
+            cache_ttl: Seconds a GET response is reused without revalidation (0 disables caching)
+            cache_size: Maximum cached GET responses
+            transport: httpx transport to use instead of the network (for tests)
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.cache = ResponseCache(max_entries=cache_size, ttl=cache_ttl)
+        self.transport = transport
+
+        # Both are bound to the running event loop, so they are created lazily
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self.transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def request(self, method: str, path: str, idempotent: Optional[bool] = None, **kwargs) -> Any:
+        """Send a request and return the decoded JSON body"""
+        response = await self._send(method, path, idempotent, **kwargs)
+        return response.json()
+
+    async def _send(self, method: str, path: str, idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying transient failures
+
+        Connection failures are always retried because the request never
+        reached the server. Timeouts and 429/502/503/504 responses are only
+        retried for idempotent requests (GET and DELETE by default), so a
+        registration is never sent twice.
+
+        A 304 Not Modified is returned as is, for conditional GETs.
+
+        Raises:
+            httpx.HTTPStatusError: For 4xx/5xx responses once retries are exhausted
+            httpx.TransportError: If the API cannot be reached
+        """
+        if idempotent is None:
+            idempotent = method in ("GET", "DELETE")
+        client = self._get_client()
+
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    response = await client.request(method, path, **kwargs)
+                if not (idempotent and response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries):
+                    # raise_for_status treats every non-2xx status as an error, 304 included
+                    if response.status_code != 304:
+                        response.raise_for_status()
+                    return response
+            except (httpx.ConnectError, httpx.PoolTimeout):
+                if attempt >= self.max_retries:
+                    raise
+            except httpx.TransportError:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+
+            attempt += 1
+            delay = self.backoff_seconds * (2 ** (attempt - 1))
+            await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def get(self, path: str, params: Optional[dict] = None, cache: bool = True) -> Any:
+        """GET through the cache; stale entries are revalidated with If-None-Match"""
+        if params:
+            params = {key: value for key, value in params.items() if value is not None}
+        if not cache or self.cache.ttl <= 0:
+            return await self.request("GET", path, params=params)
+
+        cache_key = self.cache.key(path, params)
+        body, etag = self.cache.lookup(cache_key)
+        if body is not None:
+            return body
+
+        generation = self.cache.generation
+        headers = {"If-None-Match": etag} if etag else None
+        response = await self._send("GET", path, params=params, headers=headers)
+        if response.status_code == 304:
+            body = self.cache.refresh(cache_key, generation)
+            if body is not None:
+                return body
+            # The entry was invalidated while revalidating
+            generation = self.cache.generation
+            response = await self._send("GET", path, params=params)
+
+        body = response.json()
+        self.cache.store(cache_key, body, response.headers.get("ETag"), generation)
+        return body
+
+    async def post(self, path: str, json: Any = None, idempotent: bool = False,
+                   invalidates: Iterable[str] = ()) -> Any:
+        """
+        POST a request
+
+        Args:
+            invalidates: Cached GET paths this write makes stale; they are
+                dropped even if the request fails, as it may have applied
+        """
+        try:
+            return await self.request("POST", path, idempotent=idempotent, json=json)
+        finally:
+            if invalidates:
+                self.cache.invalidate(invalidates)
+
+    async def delete(self, path: str, invalidates: Iterable[str] = ()) -> Any:
+        """DELETE a resource; its own cached GET is always invalidated"""
+        try:
+            return await self.request("DELETE", path)
+        finally:
+            self.cache.invalidate([path, *invalidates])
+
+    async def bulk(self, path: str, key: str, items: list, idempotent: bool = False,
+                   invalidates: Iterable[str] = ()) -> dict:
+        """
+        POST items to a bulk endpoint in concurrent chunks and merge the results
+
+        Args:
+            path: Bulk endpoint, e.g. "/users/bulk-register"
+            key: Body field holding the items ("users" or "ids")
+            items: Records to send
+            idempotent: Whether chunks may be retried after a timeout
+            invalidates: Cached GET paths the writes make stale
+
+        Returns:
+            Succeeded/failed counts and per-item results in input order. A
+            chunk whose request failed reports each of its items as an error,
+            so results of the chunks that succeeded are never lost.
+        """
+        starts = range(0, len(items), BULK_CHUNK_SIZE)
+        bodies = await asyncio.gather(*(
+            self.post(path, json={key: items[start:start + BULK_CHUNK_SIZE]},
+                      idempotent=idempotent, invalidates=invalidates)
+            for start in starts
+        ), return_exceptions=True)
+
+        merged = {"succeeded": 0, "failed": 0, "results": []}
+        for start, body in zip(starts, bodies):
+            if isinstance(body, BaseException):
+                if not isinstance(body, Exception):
+                    raise body
+                chunk = items[start:start + BULK_CHUNK_SIZE]
+                # A write that timed out may still have been applied by the API
+                detail = f"Request for this chunk failed: {body!r}"
+                merged["failed"] += len(chunk)
+                merged["results"].extend(
+                    {
+                        "index": start + offset,
+                        "id": item if isinstance(item, int) else None,
+                        "status": "error",
+                        "user": None,
+                        "detail": detail,
+                    }
+                    for offset, item in enumerate(chunk)
+                )
+                continue
+            merged["succeeded"] += body["succeeded"]
+            merged["failed"] += body["failed"]
+            for result in body["results"]:
+                result["index"] += start
+                merged["results"].append(result)
+        return merged
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_client: Optional[UserAPIClient] = None
+
+
+def get_client() -> UserAPIClient:
+    """Process-wide client shared by all tools and sessions"""
+    global _client
+    if _client is None:
+        _client = UserAPIClient()
+    return _client
@@ -0,0 +1,113 @@
+"""
+Semantic answer cache for repeated and near-duplicate questions
+"""
+import copy
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Hashable, Optional, Tuple
+
+
+class SemanticAnswerCache:
+    """LRU + TTL cache of answers, looked up by question embedding similarity"""
+
+    def __init__(self,
+                 similarity_threshold: float = 0.95,
+                 max_entries: int = 256,
+                 ttl_seconds: Optional[float] = 3600):
+        """
+        Initialize the cache
+
+        Args:
+            similarity_threshold: Minimum cosine similarity between question
+                embeddings for a cached answer to be reused
+            max_entries: Maximum number of cached answers before LRU eviction
+            ttl_seconds: Lifetime of a cached answer (None for no expiry)
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[int, Tuple[Hashable, List[float], Dict[str, Any], float]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> List[float]:
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def lookup(self, vector: List[float], namespace: Hashable) -> Optional[Dict[str, Any]]:
+        """
+        Find the cached answer closest to a question embedding
+
+        Args:
+            vector: Question embedding
+            namespace: Only entries stored under the same namespace (e.g.
+                collection version and source filter) can match
+
+        Returns:
+            Copy of the cached response with its "similarity", or None
+        """
+        query = self._normalize(vector)
+        now = time.time()
+
+        with self._lock:
+            best_id, best_similarity = None, -1.0
+            for entry_id, (entry_namespace, entry_vector, _, created) in list(self._entries.items()):
+                if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                    del self._entries[entry_id]
+                    continue
+                if entry_namespace != namespace:
+                    continue
+
+                similarity = sum(a * b for a, b in zip(query, entry_vector))
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None or best_similarity < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            response = copy.deepcopy(self._entries[best_id][2])
+
+        response["similarity"] = round(best_similarity, 4)
+        return response
+
+    def store(self, vector: List[float], namespace: Hashable, response: Dict[str, Any]):
+        """
+        Cache an answer for a question embedding
+
+        Args:
+            vector: Question embedding
+            namespace: Namespace the answer is valid for
+            response: Response dict to return on later hits
+        """
+        entry = (namespace, self._normalize(vector), copy.deepcopy(response), time.time())
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached answer"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
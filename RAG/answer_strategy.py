@@ -0,0 +1,80 @@
+"""
+Answer strategies for combining retrieved chunks into one LLM answer
+"""
+from typing import List, Any
+
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.schema import Document
+
+CHAIN_TYPES = ("stuff", "map_reduce", "refine")
+
+# Rough allowance for the chain's own prompt template around the chunks
+PROMPT_OVERHEAD_TOKENS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token), no tokenizer needed"""
+    return len(text) // 4 + 1
+
+
+def select_chain_type(documents: List[Document],
+                      question: str,
+                      context_window: int,
+                      answer_tokens: int) -> str:
+    """
+    Pick the cheapest strategy whose prompts fit the model's context window
+
+    "stuff" answers in a single LLM call, so it wins whenever every chunk
+    fits in one prompt. Otherwise "map_reduce" keeps each prompt to a
+    single chunk.
+
+    Args:
+        documents: Retrieved chunks
+        question: Question sent to the chain
+        context_window: Model context size in tokens
+        answer_tokens: Tokens reserved for the generated answer
+
+    Returns:
+        Chain type name
+    """
+    budget = context_window - answer_tokens - PROMPT_OVERHEAD_TOKENS
+    prompt_tokens = estimate_tokens(question) + sum(
+        estimate_tokens(doc.page_content) for doc in documents
+    )
+    return "stuff" if prompt_tokens <= budget else "map_reduce"
+
+
+def fit_to_context(documents: List[Document],
+                   question: str,
+                   context_window: int,
+                   answer_tokens: int) -> List[Document]:
+    """
+    Keep the highest-ranked chunks that fit a single "stuff" prompt
+
+    Args:
+        documents: Retrieved chunks, best first
+        question: Question sent to the model
+        context_window: Model context size in tokens
+        answer_tokens: Tokens reserved for the generated answer
+
+    Returns:
+        Prefix of documents (at least one) that fits the context window
+    """
+    budget = context_window - answer_tokens - PROMPT_OVERHEAD_TOKENS - estimate_tokens(question)
+    fitted = []
+    for doc in documents:
+        budget -= estimate_tokens(doc.page_content)
+        if budget < 0 and fitted:
+            break
+        fitted.append(doc)
+    return fitted
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    """Counts LLM calls made while a chain runs"""
+
+    def __init__(self):
+        self.llm_calls = 0
+
+    def on_llm_start(self, serialized: Any, prompts: List[str], **kwargs: Any) -> None:
+        self.llm_calls += 1
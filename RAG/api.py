@@ -0,0 +1,115 @@
+"""
+Headless async HTTP service for the RAG engine
+
+Run with: uvicorn api:app --port 8001
+"""
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from rag_client import INVALID_REQUEST, RAGClient
+
+DATA_DIR = os.environ.get("RAG_DATA_DIR", "./data")
+MAX_CONCURRENT_GENERATIONS = int(os.environ.get("RAG_MAX_CONCURRENT_GENERATIONS", "2"))
+QUERY_BATCH_WAIT_MS = float(os.environ.get("RAG_QUERY_BATCH_WAIT_MS", "5"))
+# Append every query trace to this file ("jsonl" or "otlp" format)
+TRACE_PATH = os.environ.get("RAG_TRACE_PATH")
+TRACE_FORMAT = os.environ.get("RAG_TRACE_FORMAT", "jsonl")
+
+
+class IngestRequest(BaseModel):
+    paths: Optional[List[str]] = None
+    directory: Optional[str] = None
+
+
+class QueryRequest(BaseModel):
+    question: str
+    sources: Optional[List[str]] = None
+    chain_type: Optional[str] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One engine per process; concurrent query embeddings are micro-batched,
+    # and only the LLM step is capped so Ollama is not oversubscribed
+    app.state.engine = RAGClient(
+        query_batch_wait_ms=QUERY_BATCH_WAIT_MS,
+        max_concurrent_generations=MAX_CONCURRENT_GENERATIONS,
+        trace_path=TRACE_PATH,
+        trace_format=TRACE_FORMAT
+    )
+
+    if os.path.isdir(DATA_DIR):
+        result = await run_in_threadpool(app.state.engine.load_directory, DATA_DIR)
+        if not result["success"]:
+            print(f"Startup ingestion skipped: {result['error']}")
+    yield
+
+
+app = FastAPI(title="RAG Query Service", lifespan=lifespan)
+
+
+def raise_for_result(result: dict):
+    """400 for a bad request, 503 when Ollama, Chroma or the engine failed"""
+    if not result["success"]:
+        status_code = 400 if result.get("error_type") == INVALID_REQUEST else 503
+        raise HTTPException(status_code=status_code, detail=result["error"])
+
+
+@app.post("/ingest")
+async def ingest(request: IngestRequest):
+    engine: RAGClient = app.state.engine
+    if request.directory:
+        result = await run_in_threadpool(engine.load_directory, request.directory)
+    elif request.paths:
+        result = await run_in_threadpool(engine.add_documents, request.paths)
+    else:
+        raise HTTPException(status_code=400, detail="Provide paths or directory")
+
+    raise_for_result(result)
+    return result
+
+
+@app.post("/query")
+async def query(request: QueryRequest):
+    engine: RAGClient = app.state.engine
+    result = await run_in_threadpool(
+        engine.query, request.question, request.sources, request.chain_type
+    )
+
+    raise_for_result(result)
+    return result
+
+
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """Stream query events as newline-delimited JSON"""
+    engine: RAGClient = app.state.engine
+
+    async def events():
+        stream = engine.query_stream(request.question, request.sources)
+        async for event in iterate_in_threadpool(stream):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.get("/documents")
+async def list_documents():
+    return await run_in_threadpool(app.state.engine.list_documents)
+
+
+@app.get("/stats")
+async def stats():
+    return app.state.engine.stats()
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "documents_loaded": app.state.engine.documents_loaded}
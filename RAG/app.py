@@ -6,35 +6,82 @@ import os
 from rag_client import RAGClient
 
 
-def init_session_state():
-    """Initialize session state with automatic PDF loading"""
-    if "rag_client" not in st.session_state:
-        # Look for PDF files in the data directory
-        pdf_path = "./data/diet_plan.pdf"
-        
-        if os.path.exists(pdf_path):
-            with st.spinner("🔄 Loading document..."):
-                try:
-                    st.session_state.rag_client = RAGClient()
-                    result = st.session_state.rag_client.load_pdf(pdf_path)
-                    if result["success"]:
-                        st.session_state.document_loaded = True
-                        st.session_state.document_name = os.path.basename(pdf_path)
-                    else:
-                        st.error(f"❌ Error loading document: {result['error']}")
-                        st.session_state.document_loaded = False
-                        st.session_state.rag_client = RAGClient()
-                except Exception as e:
-                    st.error(f"❌ Error loading document: {str(e)}")
-                    st.session_state.document_loaded = False
-                    st.session_state.rag_client = RAGClient()
-        else:
-            st.error("❌ No PDF found in data directory")
-            st.session_state.document_loaded = False
-            st.session_state.rag_client = RAGClient()
+DATA_DIR = "./data"
+# Optional trace file, same settings as the HTTP API
+TRACE_PATH = os.environ.get("RAG_TRACE_PATH")
+TRACE_FORMAT = os.environ.get("RAG_TRACE_FORMAT", "jsonl")
+
+
+@st.cache_resource(show_spinner=False)
+def get_rag_engine(_progress_callback=None) -> RAGClient:
+    """
+    Load the RAG engine shared by every browser session
     
+    Cached once per server process, so startup cost and memory do not grow
+    with the number of sessions. A failed load raises and is not cached.
+    """
+    client = RAGClient(trace_path=TRACE_PATH, trace_format=TRACE_FORMAT)
+    result = client.load_directory(DATA_DIR, progress_callback=_progress_callback)
+    if not result["success"]:
+        raise RuntimeError(result["error"])
+    return client
+
+
+def init_session_state():
+    """Initialize per-session state and attach the shared RAG engine"""
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
+    
+    # Look for PDF files in the data directory
+    pdf_found = os.path.isdir(DATA_DIR) and any(
+        name.lower().endswith(".pdf") for _, _, files in os.walk(DATA_DIR) for name in files
+    )
+    if not pdf_found:
+        st.error("❌ No PDF found in data directory")
+        return None
+    
+    # Only rendered by the session that actually performs the load
+    progress_placeholder = st.empty()
+    
+    def on_progress(progress):
+        total = progress.get("total_pages") or 0
+        fraction = min(progress["pages"] / total, 1.0) if total else 0.0
+        progress_placeholder.progress(
+            fraction,
+            text=f"🔄 Page {progress['pages']}/{total or '?'} · "
+                 f"{progress['written']} chunks embedded"
+        )
+    
+    try:
+        with st.spinner("🔄 Loading documents..."):
+            rag_client = get_rag_engine(on_progress)
+        progress_placeholder.empty()
+        return rag_client
+    except Exception as e:
+        progress_placeholder.empty()
+        st.error(f"❌ Error loading document: {str(e)}")
+        return None
+
+
+def render_trace(trace):
+    """Per-stage timing breakdown of one query"""
+    spans = trace.get("spans", [])
+    depth = {}
+    for span in spans:
+        depth[span["span_id"]] = depth.get(span["parent_id"], -1) + 1
+    
+    rows = []
+    for span in spans:
+        attributes = span["attributes"]
+        rows.append({
+            "stage": "\u2003" * depth[span["span_id"]] + span["name"],
+            "start (ms)": span["start_ms"],
+            "duration (ms)": span["duration_ms"],
+            "prompt tokens": attributes.get("prompt_tokens"),
+            "completion tokens": attributes.get("completion_tokens"),
+        })
+    st.caption(f"Trace {trace['trace_id'][:8]} · {trace['duration_ms']:.0f} ms total")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
 
 
 def main():
@@ -45,14 +92,16 @@ def main():
         layout="wide"
     )
     
-    init_session_state()
+    rag_client = init_session_state()
     
     st.title("🤖 RAG PDF Query System")
     st.markdown("**Ask questions about your PDF document using LangChain & Ollama**")
     
     # Show document status
-    if st.session_state.get("document_loaded", False):
-        st.success(f"📄 **Document loaded:** {st.session_state.get('document_name', 'Unknown')}")
+    documents = rag_client.list_documents() if rag_client else []
+    if documents:
+        names = ", ".join(document["name"] for document in documents) or "Unknown"
+        st.success(f"📄 **Documents loaded ({len(documents)}):** {names}")
     else:
         st.warning("📄 No document loaded")
         return
@@ -64,33 +113,65 @@ def main():
         placeholder="What is this document about?"
     )
     
+    selected_sources = None
+    if len(documents) > 1:
+        selected = st.multiselect(
+            "Search in (all documents if empty):",
+            options=[document["source"] for document in documents],
+            format_func=os.path.basename
+        )
+        selected_sources = selected or None
+    
+    show_trace = st.sidebar.checkbox("⏱️ Show timing breakdown", value=False)
+    
     if st.button("🔍 Ask", type="primary") and query:
-        with st.spinner("Thinking..."):
-            try:
-                response = st.session_state.rag_client.query(query)
+        try:
+            st.subheader("🤖 Answer")
+            answer_placeholder = st.empty()
+            answer_placeholder.markdown("_Thinking..._")
+            
+            # Render tokens as Ollama produces them
+            answer = ""
+            response = None
+            for event in rag_client.query_stream(query, sources=selected_sources):
+                if event["type"] == "token":
+                    answer += event["text"]
+                    answer_placeholder.markdown(answer + "▌")
+                elif event["type"] in ("done", "error"):
+                    response = event
+            
+            if response and response["type"] == "done":
+                answer_placeholder.markdown(response["answer"])
+                
+                # Add to chat history
+                st.session_state.chat_history.append({
+                    "question": query,
+                    "answer": response["answer"],
+                    "sources": response.get("sources", [])
+                })
+                
+                timings = response.get("timings", {})
+                st.caption(
+                    f"⏱️ first token {timings.get('time_to_first_token_seconds', 0):.1f}s · "
+                    f"total {timings.get('total_seconds', 0):.1f}s · {response.get('chain_type')} · "
+                    f"{timings.get('llm_calls', 0)} LLM call(s)"
+                )
+                
+                # Display sources
+                if response.get("sources"):
+                    with st.expander("📚 Sources"):
+                        for i, source in enumerate(response["sources"], 1):
+                            st.text(f"{i}. {source['content'][:200]}...")
+                
+                if show_trace and response.get("trace"):
+                    with st.expander("⏱️ Timing breakdown", expanded=True):
+                        render_trace(response["trace"])
+            else:
+                answer_placeholder.empty()
+                st.error(f"❌ Error: {response['error'] if response else 'No response'}")
                 
-                if response["success"]:
-                    # Add to chat history
-                    st.session_state.chat_history.append({
-                        "question": query,
-                        "answer": response["answer"],
-                        "sources": response.get("sources", [])
-                    })
-                    
-                    # Display response
-                    st.subheader("🤖 Answer")
-                    st.write(response["answer"])
-                    
-                    # Display sources
-                    if response.get("sources"):
-                        with st.expander("📚 Sources"):
-                            for i, source in enumerate(response["sources"], 1):
-                                st.text(f"{i}. {source['content'][:200]}...")
-                else:
-                    st.error(f"❌ Error: {response['error']}")
-                    
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
+        except Exception as e:
+            st.error(f"❌ Error: {str(e)}")
     
     # Chat history
     if st.session_state.chat_history:
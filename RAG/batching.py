@@ -0,0 +1,152 @@
+"""
+Batched embedding requests for Ollama and micro-batching of concurrent queries
+"""
+import threading
+import time
+from typing import List, Any, Callable
+
+import requests
+from langchain.embeddings import OllamaEmbeddings
+from langchain.schema.embeddings import Embeddings
+
+
+class OllamaBatchEmbeddings(OllamaEmbeddings):
+    """OllamaEmbeddings that sends a whole batch in one /api/embed request
+
+    The stock client issues one /api/embeddings request per text. Vectors
+    from /api/embed are L2-normalized, so they must not be mixed with ones
+    produced by the stock client.
+    """
+
+    def _embed(self, input: List[str]) -> List[List[float]]:
+        if not input:
+            return []
+
+        response = requests.post(
+            f"{self.base_url}/api/embed",
+            headers={"Content-Type": "application/json"},
+            json={"model": self.model, "input": input, "options": self._default_params["options"]},
+        )
+        if response.status_code != 200:
+            raise ValueError(
+                f"Error raised by inference API HTTP code: {response.status_code}, {response.text}"
+            )
+        return response.json()["embeddings"]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in one request"""
+        return self._embed([f"{self.query_instruction}{text}" for text in texts])
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item calls into one batched call
+
+    The first caller to arrive waits up to max_wait_seconds for others to
+    join, then runs the batch function once for everybody.
+    """
+
+    def __init__(self,
+                 batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 32,
+                 max_wait_seconds: float = 0.005):
+        """
+        Initialize the batcher
+
+        Args:
+            batch_fn: Maps a list of items to a list of results, in order
+            max_batch_size: Flush as soon as this many items are waiting
+            max_wait_seconds: How long the first item waits for company
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+
+        self.batches = 0
+        self.items = 0
+
+        self._condition = threading.Condition()
+        self._pending: List[dict] = []
+
+    def submit(self, item: Any) -> Any:
+        """Process one item as part of the next batch and return its result"""
+        slot = {"item": item, "done": False, "result": None, "error": None}
+
+        with self._condition:
+            self._pending.append(slot)
+            leader = len(self._pending) == 1
+            if len(self._pending) >= self.max_batch_size:
+                self._condition.notify_all()
+
+            if not leader:
+                while not slot["done"]:
+                    self._condition.wait()
+            else:
+                deadline = time.monotonic() + self.max_wait_seconds
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._pending = self._pending, []
+
+        if leader:
+            try:
+                results = self.batch_fn([entry["item"] for entry in batch])
+                for entry, result in zip(batch, results):
+                    entry["result"] = result
+            except Exception as e:
+                for entry in batch:
+                    entry["error"] = e
+
+            with self._condition:
+                self.batches += 1
+                self.items += len(batch)
+                for entry in batch:
+                    entry["done"] = True
+                self._condition.notify_all()
+
+        if slot["error"] is not None:
+            raise slot["error"]
+        return slot["result"]
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """Embeddings wrapper that batches concurrent embed_query calls"""
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 max_batch_size: int = 32,
+                 max_wait_seconds: float = 0.005):
+        """
+        Initialize the wrapper
+
+        Args:
+            embeddings: Underlying embeddings; its embed_queries method is
+                used for batches when available
+            max_batch_size: Maximum queries per batch
+            max_wait_seconds: How long a query waits for others to join
+        """
+        self.embeddings = embeddings
+        self.batcher = MicroBatcher(self._embed_batch, max_batch_size, max_wait_seconds)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if hasattr(self.embeddings, "embed_queries"):
+            return self.embeddings.embed_queries(texts)
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Documents are already batched by the caller"""
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query together with any concurrent ones"""
+        return self.batcher.submit(text)
+
+    def stats(self) -> dict:
+        """Batching counters, merged with the wrapped embedder's stats"""
+        stats = self.embeddings.stats() if hasattr(self.embeddings, "stats") else {}
+        return {
+            **stats,
+            "query_batches": self.batcher.batches,
+            "batched_queries": self.batcher.items,
+        }
@@ -0,0 +1,267 @@
+"""
+Offline ingestion and query benchmark for RAGClient
+
+Runs RAGClient against deterministic local backends (benchmarks/fakes.py)
+instead of Ollama, on synthetic PDFs of a chosen page count, and reports:
+
+- ingestion: pages/sec through the whole pipeline, chunks/sec embedded
+- queries: retrieval and end-to-end latency percentiles per chain type,
+  LLM calls and prompt tokens per query, and recall (the answer page is
+  among the retrieved chunks)
+- footprint: peak RSS growth during ingestion and query, store size on disk
+
+Every (pages, chunk size, overlap) case runs in a fresh subprocess with a
+fresh store, so memory numbers do not leak between cases.
+
+Run from the RAG directory in an environment with requirements.txt installed:
+
+    python benchmarks/bench_rag.py --pages 10 100 1000
+    python benchmarks/bench_rag.py --pages 1000 --chunking 500:0 1000:50 1500:50 1500:200
+    python benchmarks/bench_rag.py --pages 100 --chain-types stuff map_reduce refine --llm-output-token-ms 20
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RAG_DIR = os.path.dirname(BENCH_DIR)
+
+CHAIN_TYPES = ("stuff", "map_reduce", "refine")
+DEFAULT_CHUNKING = ["1500:50"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def latency_summary(values_ms: List[float]) -> Dict[str, float]:
+    values_ms = sorted(values_ms)
+    return {
+        "p50_ms": round(percentile(values_ms, 50), 3),
+        "p95_ms": round(percentile(values_ms, 95), 3),
+        "max_ms": round(values_ms[-1], 3) if values_ms else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def directory_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return round(total / (1024 * 1024), 2)
+
+
+def span_ms(trace: Dict[str, Any], name: str) -> float:
+    return sum(span["duration_ms"] or 0.0 for span in trace["spans"] if span["name"] == name)
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ingest one synthetic PDF and query it; runs inside a worker process
+
+    Args:
+        case: Settings from the parent process (see main)
+
+    Returns:
+        Measurements for this case
+    """
+    sys.path.insert(0, RAG_DIR)
+    sys.path.insert(0, BENCH_DIR)
+    from fakes import FakeEmbeddings, FakeLLM
+    from rag_client import RAGClient
+    from synthetic_pdf import fact_sentence
+
+    work_dir = tempfile.mkdtemp(prefix="bench-rag-")
+    try:
+        client = RAGClient(
+            persist_directory=os.path.join(work_dir, "chroma_db"),
+            chunk_size=case["chunk_size"],
+            chunk_overlap=case["chunk_overlap"],
+            top_k=case["top_k"],
+            hybrid_search=case["hybrid"],
+            embed_batch_size=case["embed_batch_size"],
+            embed_workers=case["embed_workers"],
+            # Every query must reach retrieval and the LLM
+            answer_cache_threshold=None,
+            embeddings=FakeEmbeddings(
+                seconds_per_request=case["embed_request_ms"] / 1000,
+                seconds_per_text=case["embed_text_ms"] / 1000
+            ),
+            llm=FakeLLM(
+                seconds_per_prompt_token=case["llm_prompt_token_ms"] / 1000,
+                seconds_per_output_token=case["llm_output_token_ms"] / 1000
+            )
+        )
+        rss_start = peak_rss_mb()
+
+        loaded = client.load_pdf(case["pdf"], incremental=False)
+        if not loaded["success"]:
+            raise RuntimeError(loaded["error"])
+        metrics = loaded["metrics"]
+        rss_ingested = peak_rss_mb()
+
+        rng = random.Random(case["seed"])
+        pages = [rng.randrange(case["pages"]) for _ in range(case["queries"])]
+        retrieval_ms = []
+        hits = 0
+        chains = {}
+        for chain_type in case["chain_types"]:
+            total_ms = []
+            llm_calls = 0
+            prompt_tokens = 0
+            for page in pages:
+                result = client.query(fact_sentence(page)[0], chain_type=chain_type)
+                if not result["success"]:
+                    raise RuntimeError(result["error"])
+                trace = result["trace"]
+                total_ms.append(trace["duration_ms"])
+                retrieval_ms.append(span_ms(trace, "embed") + span_ms(trace, "retrieve"))
+                hits += any(source["metadata"].get("page") == page for source in result["sources"])
+                llm_calls += result["timings"]["llm_calls"]
+                prompt_tokens += result["timings"]["prompt_tokens"]
+            chains[chain_type] = {
+                **latency_summary(total_ms),
+                "llm_calls_per_query": round(llm_calls / len(pages), 2),
+                "prompt_tokens_per_query": round(prompt_tokens / len(pages), 1),
+            }
+
+        seconds = metrics["seconds"]
+        return {
+            "pages": case["pages"],
+            "chunk_size": case["chunk_size"],
+            "chunk_overlap": case["chunk_overlap"],
+            "chunks": metrics["chunks"],
+            "ingest_seconds": seconds,
+            "pages_per_second": round(metrics["pages"] / seconds, 1) if seconds else 0.0,
+            "chunks_per_second": metrics["stages"]["embed"]["items_per_second"],
+            "stages": metrics["stages"],
+            "retrieval": latency_summary(retrieval_ms),
+            "recall": round(hits / len(retrieval_ms), 3) if retrieval_ms else 0.0,
+            "chains": chains,
+            "rss_start_mb": rss_start,
+            "rss_ingest_growth_mb": round(rss_ingested - rss_start, 1),
+            "rss_peak_mb": peak_rss_mb(),
+            "store_mb": directory_size_mb(os.path.join(work_dir, "chroma_db")),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_worker(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one case in a fresh interpreter and parse its result"""
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(case)],
+        cwd=RAG_DIR,
+        capture_output=True,
+        text=True
+    )
+    for line in reversed(process.stdout.splitlines()):
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    raise RuntimeError(f"Case {case['pages']}p {case['chunk_size']}:{case['chunk_overlap']} failed:\n"
+                       f"{process.stderr[-2000:]}")
+
+
+def print_result(result: Dict[str, Any]):
+    print(f"\n{result['pages']} pages, chunk {result['chunk_size']}/{result['chunk_overlap']}"
+          f" -> {result['chunks']} chunks")
+    print(f"  ingest      {result['ingest_seconds']:>9.2f} s  {result['pages_per_second']:>9.1f} pages/s"
+          f"  {result['chunks_per_second']:>9.1f} chunks/s embedded")
+    retrieval = result["retrieval"]
+    print(f"  retrieval   p50 {retrieval['p50_ms']:>8.2f} ms  p95 {retrieval['p95_ms']:>8.2f} ms"
+          f"  recall {result['recall']:.2f}")
+    for chain_type, chain in result["chains"].items():
+        print(f"  {chain_type:<11} p50 {chain['p50_ms']:>8.2f} ms  p95 {chain['p95_ms']:>8.2f} ms"
+              f"  {chain['llm_calls_per_query']:>5} calls  {chain['prompt_tokens_per_query']:>8} prompt tokens")
+    print(f"  memory      +{result['rss_ingest_growth_mb']} MB during ingest, peak {result['rss_peak_mb']} MB,"
+          f" store {result['store_mb']} MB on disk")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RAGClient ingestion and query benchmark")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Synthetic PDF sizes to benchmark (10-10000 pages)")
+    parser.add_argument("--chunking", nargs="+", default=DEFAULT_CHUNKING,
+                        help="chunk_size:chunk_overlap settings to compare (default 1500:50)")
+    parser.add_argument("--chain-types", nargs="+", choices=CHAIN_TYPES, default=["stuff", "map_reduce"])
+    parser.add_argument("--queries", type=int, default=50, help="Queries per chain type and case")
+    parser.add_argument("--top-k", type=int, default=2)
+    parser.add_argument("--dense-only", action="store_true", help="Disable BM25 hybrid retrieval")
+    parser.add_argument("--embed-batch-size", type=int, default=32)
+    parser.add_argument("--embed-workers", type=int, default=4)
+    parser.add_argument("--embed-request-ms", type=float, default=0.0,
+                        help="Simulated latency of one embedding request")
+    parser.add_argument("--embed-text-ms", type=float, default=0.0,
+                        help="Simulated embedding latency per text")
+    parser.add_argument("--llm-prompt-token-ms", type=float, default=0.0,
+                        help="Simulated LLM prefill latency per prompt token")
+    parser.add_argument("--llm-output-token-ms", type=float, default=0.0,
+                        help="Simulated LLM decode latency per generated token")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "rag-bench-corpus"),
+                        help="Where synthetic PDFs are generated and reused")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print("RESULT " + json.dumps(run_case(json.loads(args.worker))))
+        return
+
+    sys.path.insert(0, BENCH_DIR)
+    from synthetic_pdf import corpus_pdf
+
+    results = []
+    for pages in args.pages:
+        started = time.perf_counter()
+        pdf = corpus_pdf(args.corpus_dir, pages, args.seed)
+        print(f"Corpus: {pdf} ({time.perf_counter() - started:.1f}s)")
+        for setting in args.chunking:
+            chunk_size, chunk_overlap = (int(value) for value in setting.split(":"))
+            result = run_worker({
+                "pdf": pdf,
+                "pages": pages,
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "chain_types": args.chain_types,
+                "queries": args.queries,
+                "top_k": args.top_k,
+                "hybrid": not args.dense_only,
+                "embed_batch_size": args.embed_batch_size,
+                "embed_workers": args.embed_workers,
+                "embed_request_ms": args.embed_request_ms,
+                "embed_text_ms": args.embed_text_ms,
+                "llm_prompt_token_ms": args.llm_prompt_token_ms,
+                "llm_output_token_ms": args.llm_output_token_ms,
+                "seed": args.seed,
+            })
+            print_result(result)
+            results.append(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": {k: v for k, v in vars(args).items() if k != "worker"}, "results": results},
+                      f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
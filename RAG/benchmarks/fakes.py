@@ -0,0 +1,156 @@
+"""
+Deterministic local stand-ins for the Ollama embedding model and LLM
+
+Both plug into RAGClient(embeddings=..., llm=...) so ingestion and query
+paths can be measured without an Ollama server. Optional latency settings
+simulate the time a real backend would spend per request and per token.
+"""
+import hashlib
+import math
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain.callbacks.manager import CallbackManagerForLLMRun
+from langchain.llms.base import BaseLLM
+from langchain.schema import Generation, LLMResult
+from langchain.schema.embeddings import Embeddings
+from langchain.schema.output import GenerationChunk
+
+_TOKEN = re.compile(r"\w+")
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Feature-hashed bag-of-words vectors
+
+    Texts sharing words get similar (L2-normalized) vectors, so dense
+    retrieval behaves meaningfully, and the same text always maps to the
+    same vector.
+    """
+
+    def __init__(self,
+                 dimensions: int = 384,
+                 seconds_per_request: float = 0.0,
+                 seconds_per_text: float = 0.0):
+        """
+        Initialize the fake embedder
+
+        Args:
+            dimensions: Vector size
+            seconds_per_request: Simulated fixed cost of one embedding call
+            seconds_per_text: Simulated cost per embedded text
+        """
+        self.dimensions = dimensions
+        self.seconds_per_request = seconds_per_request
+        self.seconds_per_text = seconds_per_text
+        self.model = f"fake-hash-{dimensions}"
+        self.requests = 0
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    def _bucket(self, token: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(token)
+        if bucket is None:
+            digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+            bucket = (digest % self.dimensions, 1.0 if digest >> 63 else -1.0)
+            self._buckets[token] = bucket
+        return bucket
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in _TOKEN.findall(text.lower()):
+            index, sign = self._bucket(token)
+            vector[index] += sign
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        delay = self.seconds_per_request + self.seconds_per_text * len(texts)
+        if delay:
+            time.sleep(delay)
+        return [self._vector(text) for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in one simulated request"""
+        return self._embed(texts)
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class FakeLLM(BaseLLM):
+    """
+    LLM that answers with a digest of its prompt
+
+    Simulates prefill time per prompt token and decode time per generated
+    token, and reports Ollama-style prompt_eval_count / eval_count so traces
+    show token counts as they would against Ollama.
+    """
+
+    answer_words: int = 48
+    seconds_per_prompt_token: float = 0.0
+    seconds_per_output_token: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def get_num_tokens(self, text: str) -> int:
+        # The base class would load the GPT-2 tokenizer from transformers
+        return _estimate_tokens(text)
+
+    def _answer(self, prompt: str) -> List[str]:
+        # Deterministic: the same prompt always produces the same words
+        words = _TOKEN.findall(prompt)[-200:] or ["empty"]
+        seed = int.from_bytes(hashlib.blake2b(prompt.encode(), digest_size=8).digest(), "big")
+        return [words[(seed + i * 7919) % len(words)] for i in range(self.answer_words)]
+
+    def _prefill(self, prompt: str) -> int:
+        prompt_tokens = _estimate_tokens(prompt)
+        if self.seconds_per_prompt_token:
+            time.sleep(prompt_tokens * self.seconds_per_prompt_token)
+        return prompt_tokens
+
+    def _iter_tokens(self, prompt: str) -> Iterator[str]:
+        for i, word in enumerate(self._answer(prompt)):
+            if self.seconds_per_output_token:
+                time.sleep(self.seconds_per_output_token)
+            yield word if i == 0 else " " + word
+
+    def _generate(self,
+                  prompts: List[str],
+                  stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None,
+                  **kwargs: Any) -> LLMResult:
+        generations = []
+        for prompt in prompts:
+            prompt_tokens = self._prefill(prompt)
+            text = "".join(self._iter_tokens(prompt))
+            generations.append([Generation(
+                text=text,
+                generation_info={"prompt_eval_count": prompt_tokens, "eval_count": self.answer_words}
+            )])
+        return LLMResult(generations=generations)
+
+    def _stream(self,
+                prompt: str,
+                stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        prompt_tokens = self._prefill(prompt)
+        for i, token in enumerate(self._iter_tokens(prompt)):
+            info = None
+            if i == self.answer_words - 1:
+                info = {"done": True, "prompt_eval_count": prompt_tokens, "eval_count": self.answer_words}
+            chunk = GenerationChunk(text=token, generation_info=info)
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
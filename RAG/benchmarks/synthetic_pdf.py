@@ -0,0 +1,98 @@
+"""
+Synthetic PDF corpora for the RAG benchmark
+
+Writes plain-text PDFs directly (one Helvetica text stream per page), so
+no PDF library beyond pypdf for reading is needed. Every page contains one
+"fact" sentence with a unique code, which gives each benchmark query a
+known answer page to measure retrieval recall against.
+"""
+import os
+import random
+from typing import List, Tuple
+
+VOCABULARY = (
+    "system pressure valve sensor module battery voltage filter pump motor "
+    "calibration warning service interval torque cable housing firmware signal "
+    "display temperature coolant bearing inspection replacement assembly output "
+    "input controller relay fuse circuit diagnostic procedure operator manual "
+    "safety maintenance cycle load frequency reading threshold alarm network "
+    "protein calorie serving breakfast dinner vegetable portion schedule"
+).split()
+
+LINES_PER_PAGE = 48
+WORDS_PER_LINE = 12
+
+
+def fact_sentence(page: int) -> Tuple[str, str]:
+    """(question, sentence) pair whose answer lives only on this page"""
+    code = f"QX{page * 7919 % 1000003:07d}"
+    question = f"What is the rated torque of component {code}?"
+    sentence = f"Component {code} has a rated torque of {page % 90 + 10} newton metres."
+    return question, sentence
+
+
+def page_lines(page: int, rng: random.Random) -> List[str]:
+    lines = [
+        " ".join(rng.choice(VOCABULARY) for _ in range(WORDS_PER_LINE)) + "."
+        for _ in range(LINES_PER_PAGE)
+    ]
+    # The fact sits at a random line, so it falls at varying chunk offsets
+    lines[rng.randrange(LINES_PER_PAGE)] = fact_sentence(page)[1]
+    return lines
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: int, seed: int = 0):
+    """
+    Write a text PDF with the given number of pages
+
+    Args:
+        path: Output file
+        pages: Page count
+        seed: Random seed; the same seed and page count give the same file
+    """
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    offsets = []
+
+    with open(path + ".tmp", "wb") as f:
+        def write_object(number: int, body: bytes):
+            offsets.append((number, f.tell()))
+            f.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n")
+        # 1: catalog, 2: page tree, 3: font, then (page, content) per page
+        page_ids = [4 + 2 * i for i in range(pages)]
+        write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+        write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+        write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+        for page, page_id in enumerate(page_ids):
+            text = " T* ".join(f"({_escape(line)}) Tj" for line in page_lines(page, rng))
+            stream = f"BT /F1 9 Tf 14 TL 40 760 Td {text} ET".encode()
+            write_object(page_id, (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+            ).encode())
+            write_object(page_id + 1, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+        xref_offset = f.tell()
+        count = 4 + 2 * pages - 1
+        f.write(f"xref\n0 {count + 1}\n0000000000 65535 f \n".encode())
+        for _, offset in sorted(offsets):
+            f.write(f"{offset:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {count + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+    os.replace(path + ".tmp", path)
+
+
+def corpus_pdf(directory: str, pages: int, seed: int = 0) -> str:
+    """Path of a synthetic PDF with this many pages, generated once and reused"""
+    path = os.path.join(directory, f"synthetic-{pages}p-s{seed}.pdf")
+    if not os.path.exists(path):
+        write_pdf(path, pages, seed)
+    return path
@@ -0,0 +1,177 @@
+"""
+Disk-backed embedding cache in front of a LangChain embedder
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Dict, Any
+
+from langchain.schema.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """SQLite-backed LRU cache keyed by (model, text hash)"""
+
+    def __init__(self,
+                 embeddings: Embeddings,
+                 model: str,
+                 cache_path: str,
+                 max_entries: int = 100_000):
+        """
+        Initialize the cache
+
+        Args:
+            embeddings: Underlying embedder to call on cache misses
+            model: Embedding model name; entries for any other model are dropped
+            cache_path: SQLite database file
+            max_entries: Maximum number of cached vectors before LRU eviction
+        """
+        self.embeddings = embeddings
+        self.model = model
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, key))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+
+        # Vectors from a different model are useless, invalidate them
+        self._conn.execute("DELETE FROM embeddings WHERE model != ?", (model,))
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def _key(kind: str, text: str) -> str:
+        # Documents and queries can be embedded with different instructions
+        return hashlib.sha256(f"{kind}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Fetch cached vectors and refresh their LRU timestamps"""
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    [self.model, *batch]
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                    [(now, self.model, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _store(self, items: Dict[str, List[float]]):
+        """Insert new vectors and evict the least recently used overflow"""
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, key, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(self.model, key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+            )
+            self._size += self._conn.total_changes - before
+
+            overflow = self._size - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN"
+                    " (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (overflow,)
+                )
+                self._size -= overflow
+            self._conn.commit()
+
+    def _embed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        cached = self._lookup(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        hits = sum(1 for key in keys if key in cached)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(keys) - hits
+
+        if missing:
+            if kind == "query" and hasattr(self.embeddings, "embed_queries"):
+                vectors = self.embeddings.embed_queries(list(missing.values()))
+            elif kind == "query":
+                vectors = [self.embeddings.embed_query(text) for text in missing.values()]
+            else:
+                vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._store(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, calling the underlying embedder only for misses"""
+        return self._embed("document", texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, calling the underlying embedder only on a miss"""
+        return self._embed("query", [text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, calling the underlying embedder only for misses"""
+        return self._embed("query", texts)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self._size,
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self):
+        """Drop every cached vector"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._size = 0
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
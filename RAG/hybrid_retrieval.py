@@ -0,0 +1,142 @@
+"""
+Hybrid dense + keyword retrieval with reciprocal-rank fusion
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Hashable, Optional
+
+from langchain.schema import Document
+
+from keyword_index import BM25Index
+from tracing import NULL_TRACE
+
+
+def reciprocal_rank_fusion(rankings: List[List[Hashable]], k: int = 60) -> List[Hashable]:
+    """
+    Fuse several rankings into one
+
+    Args:
+        rankings: Ranked lists of keys, best first
+        k: RRF damping constant; higher values flatten rank differences
+
+    Returns:
+        Keys ordered by fused score, best first
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class HybridRetriever:
+    """Runs dense and BM25 retrieval in parallel and fuses them with RRF"""
+
+    def __init__(self,
+                 vectorstore,
+                 keyword_index: Optional[BM25Index],
+                 k: int = 2,
+                 fetch_k: int = 10,
+                 rrf_k: int = 60,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        """
+        Initialize the retriever
+
+        Args:
+            vectorstore: Chroma vector store
+            keyword_index: BM25 index over the same chunks (None for dense only)
+            k: Number of chunks returned after fusion
+            fetch_k: Candidates taken from each retriever before fusion
+            rrf_k: Reciprocal-rank fusion constant
+            executor: Pool the dense search runs on while BM25 runs inline
+        """
+        self.vectorstore = vectorstore
+        self.keyword_index = keyword_index
+        self.k = k
+        self.fetch_k = max(fetch_k, k)
+        self.rrf_k = rrf_k
+        self.executor = executor
+
+    @staticmethod
+    def _key(doc: Document) -> tuple:
+        # Chroma search results carry no ids, so match chunks by content
+        return doc.metadata.get("source"), doc.metadata.get("page"), doc.page_content
+
+    def _dense_search(self, question: str, query_vector: Optional[List[float]], k: int, search_filter):
+        if query_vector is not None:
+            return self.vectorstore.similarity_search_by_vector(query_vector, k=k, filter=search_filter)
+        return self.vectorstore.similarity_search(question, k=k, filter=search_filter)
+
+    def retrieve(self,
+                 question: str,
+                 sources: Optional[List[str]] = None,
+                 query_vector: Optional[List[float]] = None,
+                 trace=NULL_TRACE) -> List[Document]:
+        """
+        Retrieve the chunks most relevant to a question
+
+        Args:
+            question: User question
+            sources: Restrict retrieval to these (absolute) document paths
+            query_vector: Question embedding, if the caller already has it
+            trace: Trace the dense, keyword, fetch and fusion spans go to
+
+        Returns:
+            Up to k chunks, best first
+        """
+        search_filter = None
+        if sources:
+            search_filter = {"source": sources[0]} if len(sources) == 1 else {"source": {"$in": sources}}
+
+        if self.keyword_index is None:
+            with trace.span("retrieve.dense", k=self.k) as span:
+                dense_docs = self._dense_search(question, query_vector, self.k, search_filter)
+                span.set(hits=len(dense_docs))
+            return dense_docs
+
+        # The dense search runs on another thread, so its span is parented explicitly
+        parent = trace.current()
+
+        def dense_search() -> List[Document]:
+            with trace.span("retrieve.dense", parent=parent, k=self.fetch_k) as span:
+                docs = self._dense_search(question, query_vector, self.fetch_k, search_filter)
+                span.set(hits=len(docs))
+                return docs
+
+        dense_future = self.executor.submit(dense_search) if self.executor else None
+        with trace.span("retrieve.keyword", k=self.fetch_k) as span:
+            keyword_hits = self.keyword_index.search(question, self.fetch_k, sources)
+            span.set(hits=len(keyword_hits))
+        dense_docs = dense_future.result() if dense_future else dense_search()
+
+        # The index only holds ids; fetch keyword hits' text from Chroma
+        documents = {self._key(doc): doc for doc in dense_docs}
+        keyword_keys = []
+        keyword_ids = [chunk_id for chunk_id, _ in keyword_hits]
+        if keyword_ids:
+            with trace.span("retrieve.fetch", ids=len(keyword_ids)):
+                fetched = self.vectorstore.get(ids=keyword_ids, include=["documents", "metadatas"])
+            by_id = {
+                chunk_id: Document(page_content=text, metadata=metadata or {})
+                for chunk_id, text, metadata in zip(fetched["ids"], fetched["documents"], fetched["metadatas"])
+            }
+            for chunk_id in keyword_ids:
+                doc = by_id.get(chunk_id)
+                if doc is None:
+                    continue
+                key = self._key(doc)
+                documents.setdefault(key, doc)
+                keyword_keys.append(key)
+
+        with trace.span("retrieve.fuse", candidates=len(documents)):
+            fused = reciprocal_rank_fusion(
+                [[self._key(doc) for doc in dense_docs], keyword_keys],
+                k=self.rrf_k
+            )
+        return [documents[key] for key in fused[:self.k]]
+
+    def stats(self) -> Dict[str, Any]:
+        """Index sizes"""
+        return {
+            "hybrid": self.keyword_index is not None,
+            "keyword_index_chunks": len(self.keyword_index) if self.keyword_index is not None else 0,
+        }
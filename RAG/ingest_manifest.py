@@ -0,0 +1,112 @@
+"""
+Ingestion manifest for incremental loading into the Chroma store
+"""
+import hashlib
+import json
+import os
+import uuid
+from typing import List, Dict, Any, Optional
+
+
+class IngestionManifest:
+    """Tracks which chunks of which documents are already embedded in the store"""
+
+    FILENAME = "ingest_manifest.json"
+
+    def __init__(self, persist_directory: str, settings: Dict[str, Any]):
+        """
+        Initialize the manifest
+
+        Args:
+            persist_directory: Vector store persistence directory
+            settings: Ingestion settings (embedding model, chunking); a change
+                in any of them invalidates every stored chunk
+        """
+        self.persist_directory = persist_directory
+        self.path = os.path.join(persist_directory, self.FILENAME)
+        self.settings = settings
+        self.data = {"settings": settings, "version": uuid.uuid4().hex, "sources": {}}
+        self.compatible = True
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = None
+
+            if stored and stored.get("settings") == settings:
+                self.data = stored
+                self.data.setdefault("version", uuid.uuid4().hex)
+            else:
+                self.compatible = False
+
+    @property
+    def version(self) -> str:
+        """Opaque collection version, changed whenever the stored chunks change"""
+        return self.data["version"]
+
+    def bump_version(self):
+        """Mark the collection as changed"""
+        self.data["version"] = uuid.uuid4().hex
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """Content hash of a file on disk"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def chunk_id(source: str, page: Any, content: str, occurrence: int = 0) -> str:
+        """Stable id for a chunk, derived from its source, page and text"""
+        key = f"{source}\x00{page}\x00{occurrence}\x00{content}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def sources(self) -> List[str]:
+        """Keys of all ingested sources"""
+        return list(self.data["sources"])
+
+    def get_source(self, source: str) -> Optional[Dict[str, Any]]:
+        """Manifest entry for a source, if it has been ingested"""
+        return self.data["sources"].get(source)
+
+    def is_unchanged(self, source: str, file_hash: str) -> bool:
+        """Whether the source was ingested from a file with the same content"""
+        entry = self.get_source(source)
+        return entry is not None and entry.get("file_hash") == file_hash
+
+    def chunk_ids(self, source: str) -> set:
+        """Ids of all chunks currently stored for a source"""
+        entry = self.get_source(source)
+        return set(entry["chunks"]) if entry else set()
+
+    def set_source(self, source: str, file_hash: str, num_pages: int, chunks: Dict[str, Any]):
+        """
+        Record the current state of a source
+
+        Args:
+            source: Source key (absolute file path)
+            file_hash: Content hash of the file
+            num_pages: Number of pages extracted
+            chunks: Mapping of chunk id to page number
+        """
+        self.data["sources"][source] = {
+            "file_hash": file_hash,
+            "num_pages": num_pages,
+            "chunks": chunks,
+        }
+
+    def remove_source(self, source: str):
+        """Forget a source and all of its chunks"""
+        self.data["sources"].pop(source, None)
+
+    def save(self):
+        """Atomically write the manifest to disk"""
+        os.makedirs(self.persist_directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,329 @@
+"""
+Streaming, batched ingestion pipeline for large PDF corpora
+
+Stages: page loader -> splitter -> bounded queue -> N embedding workers ->
+batched vector store upserts. Bounded queues between the stages give
+backpressure, so memory stays flat no matter how large the document is.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Dict, Any, Callable, Optional, Tuple
+
+import pypdf
+from langchain.document_loaders import PyPDFLoader
+from langchain.schema import Document
+
+_DONE = object()
+
+
+def count_pdf_pages(pdf_path: str) -> int:
+    """Number of pages in a PDF, without extracting any text"""
+    return len(pypdf.PdfReader(pdf_path).pages)
+
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[Document]:
+    """
+    Lazily extract a PDF one page at a time
+
+    Args:
+        pdf_path: Path to PDF file
+
+    Yields:
+        One Document per page, with the same metadata as PyPDFLoader
+    """
+    reader = pypdf.PdfReader(pdf_path)
+    for page_number, page in enumerate(reader.pages):
+        yield Document(
+            page_content=page.extract_text(),
+            metadata={"source": pdf_path, "page": page_number}
+        )
+
+
+def extract_pdf_pages(pdf_path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Extract all pages of a PDF; runs inside a worker process
+
+    Args:
+        pdf_path: Path to PDF file
+
+    Returns:
+        List of (page text, metadata) pairs, cheap to pickle back
+    """
+    return [(doc.page_content, doc.metadata) for doc in PyPDFLoader(pdf_path).load()]
+
+
+def iter_pdf_pages_parallel(pdf_paths: List[str], max_workers: int) -> Iterator[Document]:
+    """
+    Extract many PDFs in a process pool, yielding pages in file order
+
+    Parsing is CPU-bound, so processes sidestep the GIL. At most two files
+    per worker are in flight, which bounds memory on large corpora.
+    Workers are spawned rather than forked: the caller is multi-threaded
+    (embedding workers, web server threads, SQLite connections), and a
+    forked child can deadlock on a lock held by another thread.
+
+    Args:
+        pdf_paths: Paths to PDF files
+        max_workers: Number of worker processes
+
+    Yields:
+        One Document per page
+    """
+    if not pdf_paths:
+        return
+
+    max_workers = max(1, min(max_workers, len(pdf_paths)))
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        remaining = iter(pdf_paths)
+        in_flight = deque()
+        for path in remaining:
+            in_flight.append(pool.submit(extract_pdf_pages, path))
+            if len(in_flight) >= max_workers * 2:
+                break
+
+        while in_flight:
+            pages = in_flight.popleft().result()
+            next_path = next(remaining, None)
+            if next_path is not None:
+                in_flight.append(pool.submit(extract_pdf_pages, next_path))
+
+            for page_content, metadata in pages:
+                yield Document(page_content=page_content, metadata=metadata)
+
+
+class StageMetrics:
+    """Item count and busy time of one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items: int, seconds: float):
+        with self._lock:
+            self.items += items
+            self.seconds += seconds
+
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.seconds, 4),
+            "items_per_second": round(self.items / wall_seconds, 2) if wall_seconds else 0.0,
+        }
+
+
+class IngestionPipeline:
+    """Embeds and upserts chunks with bounded queues and concurrent workers"""
+
+    def __init__(self,
+                 embeddings,
+                 vectorstore,
+                 batch_size: int = 32,
+                 num_workers: int = 4,
+                 queue_size: int = 8,
+                 progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 keyword_index=None):
+        """
+        Initialize the pipeline
+
+        Args:
+            embeddings: LangChain embeddings used by the workers
+            vectorstore: Chroma vector store to upsert into
+            batch_size: Chunks per embedding request and per upsert
+            num_workers: Concurrent embedding workers
+            queue_size: Maximum batches waiting between two stages
+            progress_callback: Called from the calling thread after every
+                upsert with a snapshot of the pipeline counters
+            keyword_index: Optional BM25 index updated with every upsert
+        """
+        self.embeddings = embeddings
+        self.vectorstore = vectorstore
+        self.batch_size = max(1, batch_size)
+        self.num_workers = max(1, num_workers)
+        self.queue_size = max(1, queue_size)
+        self.progress_callback = progress_callback
+        self.keyword_index = keyword_index
+        # Ids upserted by the last run, kept if it fails so they can be removed
+        self.written_ids: List[str] = []
+
+    def run(self,
+            pages: Iterable[Document],
+            text_splitter,
+            assign_id: Callable[[Document], Optional[str]],
+            total_pages: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Stream pages through the pipeline
+
+        Args:
+            pages: Page documents, typically from iter_pdf_pages
+            text_splitter: Splitter applied to each page
+            assign_id: Returns the chunk id to store, or None to skip the chunk
+            total_pages: Total page count, if known, for progress reporting
+
+        Returns:
+            Dict with counters, timings and per-stage throughput
+        """
+        load_metrics = StageMetrics("load")
+        split_metrics = StageMetrics("split")
+        embed_metrics = StageMetrics("embed")
+        write_metrics = StageMetrics("write")
+
+        embed_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        counters = {"pages": 0, "chunks": 0, "skipped": 0}
+
+        def put(target: queue.Queue, item) -> bool:
+            # Block while the next stage is saturated, but give up on failure
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            batch: List[tuple] = []
+            try:
+                page_iter = iter(pages)
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    page = next(page_iter, None)
+                    if page is None:
+                        break
+                    load_metrics.record(1, time.perf_counter() - started)
+                    counters["pages"] += 1
+
+                    started = time.perf_counter()
+                    splits = text_splitter.split_documents([page])
+                    split_metrics.record(len(splits), time.perf_counter() - started)
+
+                    for split in splits:
+                        counters["chunks"] += 1
+                        chunk_id = assign_id(split)
+                        if chunk_id is None:
+                            counters["skipped"] += 1
+                            continue
+                        batch.append((chunk_id, split))
+                        if len(batch) >= self.batch_size:
+                            if not put(embed_queue, batch):
+                                return
+                            batch = []
+
+                if batch:
+                    put(embed_queue, batch)
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                for _ in range(self.num_workers):
+                    put(embed_queue, _DONE)
+
+        def embed_worker():
+            try:
+                while not stop.is_set():
+                    try:
+                        batch = embed_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if batch is _DONE:
+                        break
+
+                    started = time.perf_counter()
+                    vectors = self.embeddings.embed_documents(
+                        [split.page_content for _, split in batch]
+                    )
+                    embed_metrics.record(len(batch), time.perf_counter() - started)
+
+                    if not put(write_queue, (batch, vectors)):
+                        return
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(write_queue, _DONE)
+
+        started_at = time.perf_counter()
+        threads = [threading.Thread(target=produce, name="ingest-producer", daemon=True)]
+        threads += [
+            threading.Thread(target=embed_worker, name=f"ingest-embed-{i}", daemon=True)
+            for i in range(self.num_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Upserts (and progress callbacks) happen on the calling thread
+        written = 0
+        self.written_ids = []
+        finished_workers = 0
+        try:
+            while finished_workers < self.num_workers and not stop.is_set():
+                try:
+                    item = write_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    finished_workers += 1
+                    continue
+
+                batch, vectors = item
+                started = time.perf_counter()
+                batch_ids = [chunk_id for chunk_id, _ in batch]
+                # Recorded first: a failed upsert may still have written some
+                self.written_ids.extend(batch_ids)
+                # Vectors are already computed, so bypass Chroma.add_texts
+                self.vectorstore._collection.upsert(
+                    ids=batch_ids,
+                    embeddings=vectors,
+                    metadatas=[split.metadata for _, split in batch],
+                    documents=[split.page_content for _, split in batch]
+                )
+                if self.keyword_index is not None:
+                    self.keyword_index.add(
+                        batch_ids,
+                        [split.page_content for _, split in batch],
+                        [split.metadata.get("source") for _, split in batch]
+                    )
+                write_metrics.record(len(batch), time.perf_counter() - started)
+                written += len(batch)
+
+                if self.progress_callback:
+                    self.progress_callback({
+                        "pages": counters["pages"],
+                        "total_pages": total_pages,
+                        "chunks": counters["chunks"],
+                        "skipped": counters["skipped"],
+                        "embedded": embed_metrics.items,
+                        "written": written,
+                    })
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            if errors:
+                stop.set()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+        wall_seconds = time.perf_counter() - started_at
+        return {
+            "pages": counters["pages"],
+            "chunks": counters["chunks"],
+            "skipped": counters["skipped"],
+            "written": written,
+            "seconds": round(wall_seconds, 4),
+            "stages": {
+                metrics.name: metrics.to_dict(wall_seconds)
+                for metrics in (load_metrics, split_metrics, embed_metrics, write_metrics)
+            },
+        }
@@ -0,0 +1,240 @@
+"""
+Compact BM25 inverted index persisted alongside the Chroma store
+"""
+import json
+import math
+import os
+import re
+import struct
+import threading
+from array import array
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+
+# Keeps part numbers, doses and figures ("AB-1200", "2.5mg", "1,800") intact
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,\-/][a-z0-9]+)*")
+
+# Stored in the ingestion manifest settings: a new format rebuilds the store
+INDEX_FORMAT = "bm25-v2"
+_MAGIC = b"BM25IDX2"
+_HEADER = struct.Struct("<8sQ")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/number tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _uint32(values=()) -> array:
+    return array("I", values)
+
+
+class BM25Index:
+    """
+    BM25 keyword index over chunk ids
+
+    Chunks are numbered internally, so postings hold small integers instead
+    of repeating the chunk id. Removed chunks are left as tombstones until
+    the next save, which renumbers the live chunks.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize the index, loading it from disk if present
+
+        Args:
+            path: File the index is persisted to
+            k1: BM25 term-frequency saturation
+            b: BM25 document-length normalization
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+
+        # doc number -> chunk id (None once removed), token count, source
+        self.ids: List[Optional[str]] = []
+        self.lengths = _uint32()
+        self.sources: List[Optional[str]] = []
+        # chunk id -> doc number
+        self.doc_numbers: Dict[str, int] = {}
+        # term -> (doc numbers, term frequencies)
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.total_length = 0
+        self._removed = 0
+
+        self._lock = threading.RLock()
+
+        if os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.doc_numbers)
+
+    def _load(self):
+        """
+        Read the index file
+
+        Layout: magic, JSON header length, JSON header (ids, source table,
+        terms and their posting counts), then uint32 arrays:
+        lengths, source numbers, and all postings' doc numbers and term
+        frequencies, concatenated in term order.
+        """
+        with open(self.path, "rb") as f:
+            data = f.read()
+        magic, header_size = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} is not a {INDEX_FORMAT} keyword index")
+        offset = _HEADER.size
+        header = json.loads(data[offset:offset + header_size])
+        offset += header_size
+
+        def read(count: int) -> array:
+            nonlocal offset
+            values = _uint32()
+            values.frombytes(data[offset:offset + count * values.itemsize])
+            offset += count * values.itemsize
+            return values
+
+        self.ids = header["ids"]
+        self.doc_numbers = {chunk_id: number for number, chunk_id in enumerate(self.ids)}
+        self.lengths = read(len(self.ids))
+        source_table = header["sources"]
+        self.sources = [source_table[number] for number in read(len(self.ids))]
+        self.total_length = sum(self.lengths)
+
+        numbers = read(sum(header["counts"]))
+        frequencies = read(len(numbers))
+        start = 0
+        for term, count in zip(header["terms"], header["counts"]):
+            self.postings[term] = (numbers[start:start + count], frequencies[start:start + count])
+            start += count
+
+    def add(self, chunk_ids: List[str], texts: List[str], sources: List[str]):
+        """
+        Index chunks (re-indexing any id that is already present)
+
+        Args:
+            chunk_ids: Chunk ids, as stored in the vector store
+            texts: Chunk texts
+            sources: Source document of each chunk
+        """
+        with self._lock:
+            self.remove([chunk_id for chunk_id in chunk_ids if chunk_id in self.doc_numbers])
+            for chunk_id, text, source in zip(chunk_ids, texts, sources):
+                counts = Counter(tokenize(text))
+                length = sum(counts.values())
+                number = len(self.ids)
+                self.ids.append(chunk_id)
+                self.lengths.append(length)
+                self.sources.append(source)
+                self.doc_numbers[chunk_id] = number
+                self.total_length += length
+                for term, tf in counts.items():
+                    posting = self.postings.get(term)
+                    if posting is None:
+                        posting = self.postings[term] = (_uint32(), _uint32())
+                    posting[0].append(number)
+                    posting[1].append(tf)
+
+    def remove(self, chunk_ids: List[str]):
+        """Drop chunks from the index"""
+        with self._lock:
+            for chunk_id in chunk_ids:
+                number = self.doc_numbers.pop(chunk_id, None)
+                if number is not None:
+                    self.ids[number] = None
+                    self.sources[number] = None
+                    self.total_length -= self.lengths[number]
+                    self._removed += 1
+
+    def search(self, query: str, k: int, sources: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Rank chunks for a query
+
+        Args:
+            query: Query text
+            k: Number of results
+            sources: Only return chunks from these documents
+
+        Returns:
+            List of (chunk id, score), best first
+        """
+        allowed = set(sources) if sources else None
+
+        with self._lock:
+            num_chunks = len(self.doc_numbers)
+            if not num_chunks:
+                return []
+            average_length = self.total_length / num_chunks or 1.0
+
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                matches = zip(*posting)
+                if self._removed:
+                    matches = [(number, tf) for number, tf in matches if self.ids[number] is not None]
+                else:
+                    matches = list(matches)
+                if not matches:
+                    continue
+                idf = math.log(1 + (num_chunks - len(matches) + 0.5) / (len(matches) + 0.5))
+                for number, tf in matches:
+                    if allowed is not None and self.sources[number] not in allowed:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[number] / average_length)
+                    scores[number] = scores.get(number, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [(self.ids[number], score) for number, score in ranked]
+
+    def _compact(self):
+        """Renumber live chunks and drop the removed ones from the postings"""
+        renumber = {}
+        ids, lengths, sources = [], _uint32(), []
+        for number, chunk_id in enumerate(self.ids):
+            if chunk_id is not None:
+                renumber[number] = len(ids)
+                ids.append(chunk_id)
+                lengths.append(self.lengths[number])
+                sources.append(self.sources[number])
+
+        postings = {}
+        for term, (numbers, frequencies) in self.postings.items():
+            kept = [(renumber[number], tf) for number, tf in zip(numbers, frequencies) if number in renumber]
+            if kept:
+                postings[term] = (_uint32(number for number, _ in kept), _uint32(tf for _, tf in kept))
+
+        self.ids, self.lengths, self.sources, self.postings = ids, lengths, sources, postings
+        self.doc_numbers = {chunk_id: number for number, chunk_id in enumerate(ids)}
+        self._removed = 0
+
+    def save(self):
+        """Atomically write the index to disk"""
+        with self._lock:
+            if self._removed:
+                self._compact()
+
+            source_table = sorted(set(self.sources))
+            source_numbers = {source: number for number, source in enumerate(source_table)}
+            terms = list(self.postings)
+            header = json.dumps({
+                "ids": self.ids,
+                "sources": source_table,
+                "terms": terms,
+                "counts": [len(self.postings[term][0]) for term in terms],
+            }, separators=(",", ":")).encode("utf-8")
+
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, len(header)))
+                f.write(header)
+                self.lengths.tofile(f)
+                _uint32(source_numbers[source] for source in self.sources).tofile(f)
+                for term in terms:
+                    self.postings[term][0].tofile(f)
+                for term in terms:
+                    self.postings[term][1].tofile(f)
+            os.replace(tmp_path, self.path)
@@ -1,29 +1,49 @@
 """
 RAG PDF Query System - Simple POC
 
-Launch the Streamlit app for querying PDF documents using LangChain & Ollama.
+Launch the Streamlit app for querying PDF documents using LangChain & Ollama,
+or the headless HTTP API with `python main.py api`.
 """
+import argparse
 import subprocess
 import sys
 import os
 
 
 def main():
-    """Launch the Streamlit application"""
-    print("Starting RAG PDF Query System...")
-    print("Launching Streamlit UI...")
-    print("App will open at: http://localhost:8501")
-    print("Press Ctrl+C to stop")
-    print()
+    """Launch the Streamlit application or the HTTP API"""
+    parser = argparse.ArgumentParser(description="RAG PDF Query System")
+    parser.add_argument("mode", nargs="?", choices=["ui", "api"], default="ui",
+                        help="ui: Streamlit app (default), api: headless HTTP service")
+    parser.add_argument("--port", type=int, help="Port to listen on")
+    args = parser.parse_args()
     
-    try:
-        # Run streamlit directly
-        subprocess.run([
+    if args.mode == "api":
+        port = args.port or 8001
+        command = [
+            sys.executable, "-m", "uvicorn", "api:app",
+            "--host", "localhost",
+            "--port", str(port)
+        ]
+        print("Starting RAG PDF Query API...")
+        print(f"API will listen at: http://localhost:{port} (docs at /docs)")
+    else:
+        port = args.port or 8501
+        command = [
             sys.executable, "-m", "streamlit", "run", "app.py",
             "--server.address", "localhost",
-            "--server.port", "8501",
+            "--server.port", str(port),
             "--browser.gatherUsageStats", "false"
-        ])
+        ]
+        print("Starting RAG PDF Query System...")
+        print("Launching Streamlit UI...")
+        print(f"App will open at: http://localhost:{port}")
+    print("Press Ctrl+C to stop")
+    print()
+    
+    try:
+        # Run streamlit / uvicorn directly
+        subprocess.run(command)
     except Exception as e:
         print(f"❌ Error: {e}")
 
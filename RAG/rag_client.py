@@ -2,29 +2,88 @@
 Simple RAG Client using LangChain and Ollama
 """
 import os
-from typing import List, Dict, Any
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 from pathlib import Path
 
 # Disable ChromaDB telemetry to avoid errors
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
 os.environ["CHROMA_ANONYMIZED_TELEMETRY"] = "False"
 
-from langchain.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.vectorstores import Chroma
-from langchain.embeddings import OllamaEmbeddings
 from langchain_ollama import OllamaLLM
-from langchain.chains import RetrievalQA
-from langchain.schema import Document
+from langchain.chains.question_answering import load_qa_chain
+from langchain.llms.base import BaseLLM
+from langchain.schema import Document, format_document
+from langchain.schema.embeddings import Embeddings
+
+from answer_cache import SemanticAnswerCache
+from answer_strategy import CHAIN_TYPES, fit_to_context, select_chain_type
+from batching import MicroBatchingEmbeddings, OllamaBatchEmbeddings
+from embedding_cache import CachedEmbeddings
+from hybrid_retrieval import HybridRetriever
+from ingest_manifest import IngestionManifest
+from ingestion_pipeline import (
+    IngestionPipeline,
+    iter_pdf_pages,
+    iter_pdf_pages_parallel,
+    count_pdf_pages,
+)
+from keyword_index import INDEX_FORMAT, BM25Index
+from tracing import NULL_TRACE, Trace, TracingCallbackHandler, create_trace_exporter
+
+# error_type of a failed result: a problem with the request itself (missing
+# file, unknown chain type, nothing loaded) or a failure of Ollama, Chroma
+# or the client while serving a valid request
+INVALID_REQUEST = "invalid_request"
+BACKEND_ERROR = "backend"
+
+
+def _invalid_request(message: str) -> Dict[str, Any]:
+    return {"success": False, "error": message, "error_type": INVALID_REQUEST}
+
+
+def _backend_error(error: Exception) -> Dict[str, Any]:
+    return {"success": False, "error": str(error), "error_type": BACKEND_ERROR}
 
 
 class RAGClient:
-    """Production-grade RAG client using LangChain"""
+    """Production-grade RAG client using LangChain
+    
+    A single instance is safe to share between threads: queries run
+    concurrently while document loading is serialized.
+    """
     
     def __init__(self, 
                  model_name: str = "gpt-oss:20b",
                  ollama_base_url: str = "http://localhost:11434",
-                 persist_directory: str = "./data/chroma_db"):
+                 persist_directory: str = "./data/chroma_db",
+                 embedding_cache_path: Optional[str] = None,
+                 embedding_cache_size: int = 100_000,
+                 embed_batch_size: int = 32,
+                 embed_workers: int = 4,
+                 parse_workers: Optional[int] = None,
+                 chain_type: str = "auto",
+                 context_window: int = 4096,
+                 answer_tokens: int = 512,
+                 answer_cache_threshold: Optional[float] = 0.95,
+                 answer_cache_size: int = 256,
+                 answer_cache_ttl: Optional[float] = 3600,
+                 query_batch_wait_ms: Optional[float] = None,
+                 max_concurrent_generations: Optional[int] = None,
+                 top_k: int = 2,
+                 hybrid_search: bool = True,
+                 trace_path: Optional[str] = None,
+                 trace_format: str = "jsonl",
+                 chunk_size: int = 1500,
+                 chunk_overlap: int = 50,
+                 embeddings: Optional[Embeddings] = None,
+                 llm: Optional[BaseLLM] = None):
         """
         Initialize the RAG client
         
@@ -32,170 +91,917 @@ class RAGClient:
             model_name: Ollama model name
             ollama_base_url: Ollama server URL
             persist_directory: Vector store persistence directory
+            embedding_cache_path: Embedding cache database (defaults to
+                embedding_cache.sqlite3 next to the vector store)
+            embedding_cache_size: Maximum number of cached embeddings
+            embed_batch_size: Chunks per embedding request during ingestion
+            embed_workers: Concurrent embedding requests during ingestion
+            parse_workers: Processes used to extract PDF text in
+                add_documents (defaults to the CPU count)
+            chain_type: Answer strategy: "stuff", "map_reduce", "refine", or
+                "auto" to pick the cheapest one that fits the context window
+            context_window: Model context size in tokens, used by "auto"
+            answer_tokens: Tokens reserved for the answer, used by "auto"
+            answer_cache_threshold: Cosine similarity above which a previous
+                answer is reused for a new question (None disables the cache)
+            answer_cache_size: Maximum number of cached answers
+            answer_cache_ttl: Lifetime of a cached answer in seconds
+            query_batch_wait_ms: If set, concurrent query embeddings arriving
+                within this window are sent to Ollama as one batch
+            max_concurrent_generations: If set, at most this many queries
+                call the LLM at once; embedding, the answer cache and
+                retrieval are not limited
+            top_k: Number of chunks passed to the LLM
+            hybrid_search: Fuse BM25 keyword search with dense search, so
+                exact terms are found without raising top_k
+            trace_path: If set, every query's trace is appended to this file
+            trace_format: Trace file format: "jsonl" or "otlp" (OTLP/JSON)
+            chunk_size: Characters per chunk
+            chunk_overlap: Characters shared by neighbouring chunks
+            embeddings: Embedding backend to use instead of Ollama (still
+                wrapped in the embedding cache), e.g. a local fake for benchmarks
+            llm: LLM to use instead of Ollama
         """
         self.model_name = model_name
         self.ollama_base_url = ollama_base_url
         self.persist_directory = persist_directory
+        self.embedding_cache_path = embedding_cache_path or os.path.join(
+            os.path.dirname(os.path.abspath(persist_directory)), "embedding_cache.sqlite3"
+        )
+        self.embedding_cache_size = embedding_cache_size
+        self.embed_batch_size = embed_batch_size
+        self.embed_workers = embed_workers
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.chain_type = chain_type
+        self.context_window = context_window
+        self.answer_tokens = answer_tokens
+        self.query_batch_wait_ms = query_batch_wait_ms
+        self._generation_slots = (
+            threading.BoundedSemaphore(max_concurrent_generations) if max_concurrent_generations else None
+        )
+        self.top_k = top_k  # Retrieve fewer, more relevant chunks
+        self.hybrid_search = hybrid_search
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.trace_exporter = create_trace_exporter(trace_path, trace_format)
+        self.answer_cache = None
+        if answer_cache_threshold is not None:
+            self.answer_cache = SemanticAnswerCache(
+                similarity_threshold=answer_cache_threshold,
+                max_entries=answer_cache_size,
+                ttl_seconds=answer_cache_ttl
+            )
         
         # Initialize components
-        self._setup_components()
+        self._setup_components(embeddings, llm)
         
         # State
         self.vectorstore = None
-        self.qa_chain = None
+        self.keyword_index = None
+        self.retriever = None
+        self._retrieval_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-retrieval")
+        self.collection_version = None
+        self._answer_chains = {}
+        self._documents = None
+        
+        # Ingestion holds the write lock for its whole run. Queries do not
+        # take it: they read the same Chroma collection and BM25 index that
+        # ingestion updates in place (both are safe for concurrent use), so a
+        # query may already see part of a batch that is still being added.
+        # Chains and the document list have their own small locks so they
+        # never wait on an ingestion.
+        self._write_lock = threading.RLock()
+        self._chain_lock = threading.Lock()
+        self._documents_lock = threading.Lock()
         self.documents_loaded = False
     
-    def _setup_components(self):
-        """Setup LangChain components"""
+    def _setup_components(self,
+                          embeddings: Optional[Embeddings] = None,
+                          llm: Optional[BaseLLM] = None):
+        """Setup LangChain components, defaulting to Ollama backends"""
         # Initialize embeddings
-        self.embeddings = OllamaEmbeddings(
-            model="nomic-embed-text",  # Good embedding model for Ollama
-            base_url=self.ollama_base_url
+        if embeddings is None:
+            self.embedding_model = "nomic-embed-text"  # Good embedding model for Ollama
+            # Batched /api/embed vectors are normalized; keep them apart from
+            # stores and caches built with per-text /api/embeddings requests
+            self.embedding_key = f"{self.embedding_model}@/api/embed"
+            embeddings = OllamaBatchEmbeddings(
+                model=self.embedding_model,
+                base_url=self.ollama_base_url
+            )
+        else:
+            # Never reuse vectors from a different backend
+            self.embedding_model = getattr(embeddings, "model", type(embeddings).__name__)
+            self.embedding_key = f"{self.embedding_model}@{type(embeddings).__name__}"
+        
+        # Cache vectors on disk so repeated chunks and queries skip Ollama
+        self.embeddings = CachedEmbeddings(
+            embeddings,
+            model=self.embedding_key,
+            cache_path=self.embedding_cache_path,
+            max_entries=self.embedding_cache_size
         )
         
+        # Coalesce concurrent query embeddings into one request
+        if self.query_batch_wait_ms is not None:
+            self.embeddings = MicroBatchingEmbeddings(
+                self.embeddings,
+                max_wait_seconds=self.query_batch_wait_ms / 1000
+            )
+        
         # Initialize LLM
-        self.llm = OllamaLLM(
+        self.llm = llm or OllamaLLM(
             model=self.model_name,
             base_url=self.ollama_base_url,
             temperature=0.1
         )
         
         # Initialize text splitter
-        # Text splitter with reduced overlap to avoid repetition
+        # Defaults: larger chunks for better context, minimal overlap to reduce repetition
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1500,  # Larger chunks for better context
-            chunk_overlap=50,  # Minimal overlap to reduce repetition
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
             length_function=len,
             separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
         )
     
-    def load_pdf(self, pdf_path: str) -> Dict[str, Any]:
+    def load_pdf(self,
+                 pdf_path: str,
+                 incremental: bool = True,
+                 progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         """
-        Load and process PDF document
+        Load and process PDF document, replacing any previously loaded ones
         
         Args:
             pdf_path: Path to PDF file
+            incremental: Only embed new or changed chunks and reuse the
+                persisted store; if False the store is rebuilt from scratch
+            progress_callback: Called with pipeline counters after every
+                batch written to the vector store
             
         Returns:
             Dict with loading results
         """
         try:
-            if not os.path.exists(pdf_path):
-                return {"success": False, "error": f"File not found: {pdf_path}"}
+            with self._write_lock:
+                if not os.path.exists(pdf_path):
+                    return _invalid_request(f"File not found: {pdf_path}")
+                
+                manifest = self._load_manifest(reset=not incremental)
+                source = os.path.abspath(pdf_path)
+                
+                # The client serves one document at a time; drop any other source
+                stale_ids = []
+                for other in manifest.sources():
+                    if other != source:
+                        stale_ids.extend(manifest.chunk_ids(other))
+                        manifest.remove_source(other)
+                
+                result = self._ingest(
+                    [pdf_path],
+                    manifest,
+                    lambda paths: iter_pdf_pages(paths[0]),
+                    progress_callback,
+                    stale_ids=stale_ids
+                )
+                
+                if source in result["empty_sources"]:
+                    return _invalid_request("No content extracted from PDF")
+                
+                entry = manifest.get_source(source)
+                result["num_documents"] = entry["num_pages"]
+                result["num_chunks"] = len(entry["chunks"])
+                return result
             
-            # Clear existing vector store to avoid old chunking issues
-            if os.path.exists(self.persist_directory):
-                import shutil
-                shutil.rmtree(self.persist_directory)
+        except Exception as e:
+            return _backend_error(e)
+    
+    def add_documents(self,
+                      pdf_paths: List[str],
+                      progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Add PDF documents to the collection, keeping the ones already loaded
+        
+        Text extraction runs in a process pool; unchanged files are skipped.
+        
+        Args:
+            pdf_paths: Paths to PDF files
+            progress_callback: Called with pipeline counters after every
+                batch written to the vector store
             
-            # Load PDF
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
+        Returns:
+            Dict with loading results
+        """
+        try:
+            with self._write_lock:
+                missing = [path for path in pdf_paths if not os.path.exists(path)]
+                if missing:
+                    return _invalid_request(f"File not found: {', '.join(missing)}")
+                
+                manifest = self._load_manifest()
+                
+                return self._ingest(
+                    pdf_paths,
+                    manifest,
+                    lambda paths: iter_pdf_pages_parallel(paths, self.parse_workers),
+                    progress_callback
+                )
             
-            if not documents:
-                return {"success": False, "error": "No content extracted from PDF"}
+        except Exception as e:
+            return _backend_error(e)
+    
+    def load_directory(self,
+                       directory: str,
+                       pattern: str = "*.pdf",
+                       recursive: bool = True,
+                       progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Add every PDF in a directory to the collection
+        
+        Args:
+            directory: Directory to scan
+            pattern: Glob pattern for files to ingest
+            recursive: Also scan subdirectories
+            progress_callback: Called with pipeline counters after every
+                batch written to the vector store
             
-            # Split documents
-            splits = self.text_splitter.split_documents(documents)
+        Returns:
+            Dict with loading results
+        """
+        if not os.path.isdir(directory):
+            return _invalid_request(f"Directory not found: {directory}")
+        
+        glob = Path(directory).rglob if recursive else Path(directory).glob
+        pdf_paths = sorted(str(path) for path in glob(pattern) if path.is_file())
+        
+        if not pdf_paths:
+            return _invalid_request(f"No files matching {pattern} in {directory}")
+        
+        # Files deleted from the directory leave the collection too
+        root = os.path.join(os.path.abspath(directory), "")
+        deleted = [
+            document["source"] for document in self.list_documents()
+            if document["source"].startswith(root) and not os.path.exists(document["source"])
+        ]
+        if deleted:
+            self.remove_documents(deleted)
+        
+        return self.add_documents(pdf_paths, progress_callback)
+    
+    def remove_documents(self, sources: List[str]) -> Dict[str, Any]:
+        """
+        Remove documents and all of their chunks from the collection
+        
+        Args:
+            sources: Document paths to remove
             
-            # Create vector store with telemetry disabled
-            os.makedirs(self.persist_directory, exist_ok=True)
+        Returns:
+            Dict with removal results
+        """
+        try:
+            with self._write_lock:
+                manifest = self._load_manifest()
+                removed_ids = []
+                for source in sources:
+                    source = os.path.abspath(source)
+                    removed_ids.extend(manifest.chunk_ids(source))
+                    manifest.remove_source(source)
+                
+                if removed_ids:
+                    self._open_vectorstore()
+                    self.vectorstore.delete(ids=removed_ids)
+                    if self.keyword_index is not None:
+                        self.keyword_index.remove(removed_ids)
+                    manifest.bump_version()
+                manifest.save()
+                if removed_ids and self.keyword_index is not None:
+                    self.keyword_index.save()
+                
+                self.collection_version = manifest.version
+                self.documents_loaded = bool(manifest.sources())
+                self._set_documents(manifest)
+                
+                return {"success": True, "chunks_removed": len(removed_ids)}
             
-            # Additional telemetry disable
-            import chromadb
-            from chromadb.config import Settings
+        except Exception as e:
+            return _backend_error(e)
+    
+    def list_documents(self) -> List[Dict[str, Any]]:
+        """
+        Documents currently in the collection
+        
+        Returns:
+            List of dicts with source path, page and chunk counts
+        """
+        with self._documents_lock:
+            documents = self._documents
+        if documents is None:
+            # Manifest saves are atomic, so it can be read while ingesting;
+            # a manifest for other settings will be rebuilt, so it is empty
+            manifest = IngestionManifest(self.persist_directory, self._manifest_settings())
+            documents = self._document_snapshot(manifest) if manifest.compatible else []
+            with self._documents_lock:
+                # Keep a snapshot an ingestion stored in the meantime
+                if self._documents is None:
+                    self._documents = documents
+                documents = self._documents
+        return list(documents)
+    
+    def _document_snapshot(self, manifest: IngestionManifest) -> List[Dict[str, Any]]:
+        return [
+            {
+                "source": source,
+                "name": os.path.basename(source),
+                "num_pages": manifest.get_source(source)["num_pages"],
+                "num_chunks": len(manifest.get_source(source)["chunks"]),
+            }
+            for source in manifest.sources()
+        ]
+    
+    def _set_documents(self, manifest: IngestionManifest):
+        """Refresh the document list from the manifest an ingestion just saved"""
+        documents = self._document_snapshot(manifest)
+        with self._documents_lock:
+            self._documents = documents
+    
+    def _ingest(self,
+                pdf_paths: List[str],
+                manifest: IngestionManifest,
+                pages: Callable[[List[str]], Iterator[Document]],
+                progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                stale_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Incrementally ingest PDFs into the vector store
+        
+        Args:
+            pdf_paths: Paths to PDF files
+            manifest: Manifest of the chunks already stored
+            pages: Extracts the pages of the given (changed) files
+            progress_callback: Called with pipeline counters after every
+                batch written to the vector store
+            stale_ids: Extra chunk ids to delete from the store
             
-            chroma_settings = Settings(
-                anonymized_telemetry=False,
-                allow_reset=True
-            )
+        Returns:
+            Dict with loading results
+        """
+        self._open_vectorstore()
+        
+        # Unchanged files are not even parsed
+        pending = {}
+        for path in pdf_paths:
+            source = os.path.abspath(path)
+            file_hash = manifest.file_hash(path)
+            if not manifest.is_unchanged(source, file_hash):
+                pending[source] = (path, file_hash)
+        
+        # Hash every chunk and only embed the ones not already stored
+        existing_ids = {source: manifest.chunk_ids(source) for source in pending}
+        chunks = {source: {} for source in pending}
+        occurrences = {source: {} for source in pending}
+        page_counts = {source: 0 for source in pending}
+        
+        def tracked_pages() -> Iterator[Document]:
+            for page in pages([path for path, _ in pending.values()]):
+                # Normalized sources let queries filter by document
+                source = os.path.abspath(page.metadata["source"])
+                page.metadata["source"] = source
+                page_counts[source] += 1
+                yield page
+        
+        def assign_id(split: Document) -> Optional[str]:
+            source = split.metadata["source"]
+            page = split.metadata.get("page")
+            key = (page, split.page_content)
+            occurrence = occurrences[source].get(key, 0)
+            occurrences[source][key] = occurrence + 1
             
-            self.vectorstore = Chroma.from_documents(
-                documents=splits,
-                embedding=self.embeddings,
-                persist_directory=self.persist_directory,
-                client_settings=chroma_settings
+            chunk_id = manifest.chunk_id(source, page, split.page_content, occurrence)
+            chunks[source][chunk_id] = page
+            return None if chunk_id in existing_ids[source] else chunk_id
+        
+        metrics = {"pages": 0, "chunks": 0, "skipped": 0, "written": 0}
+        if pending:
+            # Stream pages -> chunks -> embeddings -> upserts in batches
+            pipeline = IngestionPipeline(
+                self.embeddings,
+                self.vectorstore,
+                batch_size=self.embed_batch_size,
+                num_workers=self.embed_workers,
+                progress_callback=progress_callback,
+                keyword_index=self.keyword_index
             )
+            try:
+                metrics = pipeline.run(
+                    tracked_pages(),
+                    self.text_splitter,
+                    assign_id,
+                    total_pages=sum(count_pdf_pages(path) for path, _ in pending.values())
+                )
+            except BaseException:
+                # The manifest is not saved, so nothing would ever delete
+                # the batches already written; all of them are new chunks
+                self._discard_chunks(pipeline.written_ids)
+                raise
+        
+        removed_ids = list(stale_ids or [])
+        empty_sources = []
+        for source, (_, file_hash) in pending.items():
+            removed_ids.extend(existing_ids[source] - chunks[source].keys())
+            if chunks[source]:
+                manifest.set_source(source, file_hash, page_counts[source], chunks[source])
+            else:
+                empty_sources.append(source)
+                manifest.remove_source(source)
+        
+        if removed_ids:
+            self.vectorstore.delete(ids=removed_ids)
+            if self.keyword_index is not None:
+                self.keyword_index.remove(removed_ids)
+        
+        # New answers may differ now, so cached ones must not be reused
+        changed = bool(metrics["written"] or removed_ids)
+        if changed:
+            manifest.bump_version()
+        manifest.save()
+        if changed and self.keyword_index is not None:
+            self.keyword_index.save()
+        
+        self.collection_version = manifest.version
+        self.retriever = self._build_retriever()
+        self._set_documents(manifest)
+        self.documents_loaded = bool(manifest.sources())
+        
+        return {
+            "success": True,
+            "num_files": len(pdf_paths),
+            "files_unchanged": len(pdf_paths) - len(pending),
+            "num_documents": metrics["pages"],
+            "num_chunks": metrics["chunks"],
+            "chunks_added": metrics["written"],
+            "chunks_removed": len(removed_ids),
+            "empty_sources": empty_sources,
+            "metrics": metrics,
+            "message": f"Loaded {len(pdf_paths)} files ({len(pdf_paths) - len(pending)} unchanged): "
+                       f"{metrics['pages']} pages parsed, {metrics['written']} chunks embedded, "
+                       f"{len(removed_ids)} removed"
+        }
+    
+    def _discard_chunks(self, chunk_ids: List[str]):
+        """Remove chunks written by a failed ingestion from the store and index"""
+        if not chunk_ids:
+            return
+        if self.keyword_index is not None:
+            self.keyword_index.remove(chunk_ids)
+        try:
+            self.vectorstore.delete(ids=chunk_ids)
+        except Exception as e:
+            # Keep the ingestion error; these orphans stay in the store
+            print(f"Could not remove {len(chunk_ids)} chunks of a failed ingestion: {e}")
+    
+    def _manifest_settings(self) -> Dict[str, Any]:
+        """Settings a stored collection must match to be reused"""
+        return {
+            "embedding_model": self.embedding_key,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            # Stores with an older keyword index format are rebuilt
+            "keyword_index": INDEX_FORMAT if self.hybrid_search else False,
+        }
+    
+    def _load_manifest(self, reset: bool = False) -> IngestionManifest:
+        """
+        Load the ingestion manifest, wiping the store if it is stale
+        
+        Args:
+            reset: Force a rebuild of the vector store
             
-            # Create QA chain with optimized settings
-            self.qa_chain = RetrievalQA.from_chain_type(
-                llm=self.llm,
-                chain_type="map_reduce",  # Better for handling multiple sources
-                retriever=self.vectorstore.as_retriever(
-                    search_type="similarity",
-                    search_kwargs={
-                        "k": 2,  # Retrieve fewer, more relevant chunks
-                        "score_threshold": 0.7  # Higher threshold for relevance
-                    }
-                ),
-                return_source_documents=True
-            )
+        Returns:
+            Manifest matching the current ingestion settings
+        """
+        settings = self._manifest_settings()
+        manifest = IngestionManifest(self.persist_directory, settings)
+        
+        # Chunks embedded with other settings cannot be reused
+        if reset or not manifest.compatible:
+            # Queries must not reach the collection that is being deleted
+            self.retriever = None
+            self.documents_loaded = False
+            with self._documents_lock:
+                self._documents = None
+            if os.path.exists(self.persist_directory):
+                shutil.rmtree(self.persist_directory)
+            self.vectorstore = None
+            self.keyword_index = None
+            manifest = IngestionManifest(self.persist_directory, settings)
+        
+        return manifest
+    
+    def _open_vectorstore(self):
+        """Open (or create) the persisted Chroma collection"""
+        if self.vectorstore is not None:
+            return
+        
+        # Create vector store with telemetry disabled
+        os.makedirs(self.persist_directory, exist_ok=True)
+        
+        # Additional telemetry disable
+        from chromadb.config import Settings
+        
+        # Passing client_settings makes LangChain use them as is: without
+        # is_persistent the collection would only live in memory
+        chroma_settings = Settings(
+            is_persistent=True,
+            persist_directory=self.persist_directory,
+            anonymized_telemetry=False,
+            allow_reset=True
+        )
+        
+        self.vectorstore = Chroma(
+            embedding_function=self.embeddings,
+            persist_directory=self.persist_directory,
+            client_settings=chroma_settings
+        )
+        
+        if self.hybrid_search:
+            self.keyword_index = BM25Index(os.path.join(self.persist_directory, "keyword_index.bm25"))
+    
+    def _build_retriever(self) -> HybridRetriever:
+        """
+        Create a retriever over the current vector store and keyword index
+        
+        Returns:
+            Hybrid (or dense-only) retriever
+        """
+        return HybridRetriever(
+            self.vectorstore,
+            self.keyword_index,
+            k=self.top_k,
+            fetch_k=max(10, self.top_k * 5),
+            executor=self._retrieval_pool
+        )
+    
+    def _get_answer_chain(self, chain_type: str):
+        """
+        Question answering chain for a strategy, built once and reused
+        
+        Args:
+            chain_type: One of "stuff", "map_reduce" or "refine"
             
-            self.documents_loaded = True
+        Returns:
+            Combine-documents chain
+        """
+        with self._chain_lock:
+            if chain_type not in self._answer_chains:
+                self._answer_chains[chain_type] = load_qa_chain(self.llm, chain_type=chain_type)
+            return self._answer_chains[chain_type]
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Runtime statistics of the client caches
+        
+        Returns:
+            Dict with cache counters
+        """
+        return {
+            "embedding_cache": self.embeddings.stats(),
+            "answer_cache": self.answer_cache.stats() if self.answer_cache else None,
+            "retrieval": self.retriever.stats() if self.retriever else None
+        }
+    
+    def query(self,
+              question: str,
+              sources: Optional[List[str]] = None,
+              chain_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Query the loaded documents
+        
+        Args:
+            question: User question
+            sources: Restrict retrieval to these document paths
+            chain_type: Answer strategy for this query, overriding the
+                client default ("auto", "stuff", "map_reduce" or "refine")
+            
+        Returns:
+            Dict with answer, sources and per-query timings
+        """
+        if not self.documents_loaded or not self.retriever:
+            return _invalid_request("No documents loaded. Please load a PDF first.")
+        
+        chain_type = chain_type or self.chain_type
+        if chain_type != "auto" and chain_type not in CHAIN_TYPES:
+            return _invalid_request(f"Unknown chain type: {chain_type}")
+        
+        trace = Trace("rag.query", streaming=False)
+        try:
+            started = time.perf_counter()
+            
+            query_vector = self._embed_question(question, trace)
+            requested_chain_type = chain_type
+            cache_key = self._answer_cache_key(query_vector, sources, requested_chain_type)
+            if cache_key:
+                with trace.span("answer_cache.lookup") as span:
+                    cached = self.answer_cache.lookup(*cache_key)
+                    span.set(hit=bool(cached))
+                if cached:
+                    cached["cached"] = True
+                    cached["timings"] = {"total_seconds": round(time.perf_counter() - started, 4), "llm_calls": 0}
+                    cached["trace"] = self._finish_trace(trace, cached=True)
+                    return cached
+            
+            documents = self._retrieve(question, sources, query_vector, trace)
+            retrieved = time.perf_counter()
+            
+            enhanced_query = self._enhance_question(question)
+            
+            if chain_type == "auto":
+                chain_type = select_chain_type(
+                    documents, enhanced_query, self.context_window, self.answer_tokens
+                )
+            
+            with trace.span("generate", chain_type=chain_type) as span, self._generation_slot(span):
+                llm_tracer = TracingCallbackHandler(trace, parent=span)
+                response = self._get_answer_chain(chain_type)(
+                    {"input_documents": documents, "question": enhanced_query},
+                    callbacks=[llm_tracer]
+                )
+                span.set(llm_calls=llm_tracer.llm_calls)
+            finished = time.perf_counter()
             
-            return {
+            # Not assigned to sources: the answer cache keys on the caller's filter
+            with trace.span("postprocess", chunks=len(documents)) as span:
+                cited_sources = self._format_sources(documents)
+                span.set(sources=len(cited_sources), duplicates_removed=len(documents) - len(cited_sources))
+            
+            result = {
                 "success": True,
-                "num_documents": len(documents),
-                "num_chunks": len(splits),
-                "message": f"Successfully loaded {len(documents)} pages, created {len(splits)} chunks with improved chunking"
+                "answer": response["output_text"],
+                "sources": cited_sources,
+                "num_sources": len(cited_sources),
+                "chain_type": chain_type,
+                "cached": False,
+                "timings": {
+                    "retrieval_seconds": round(retrieved - started, 4),
+                    "generation_seconds": round(finished - retrieved, 4),
+                    "total_seconds": round(finished - started, 4),
+                    "llm_calls": llm_tracer.llm_calls,
+                    "prompt_tokens": llm_tracer.prompt_tokens,
+                    "completion_tokens": llm_tracer.completion_tokens,
+                }
             }
             
+            if cache_key:
+                self.answer_cache.store(*cache_key, result)
+                if requested_chain_type != chain_type:
+                    # An "auto" answer is also a valid answer for the strategy it picked
+                    self.answer_cache.store(*self._answer_cache_key(query_vector, sources, chain_type), result)
+            
+            result["trace"] = self._finish_trace(trace, cached=False)
+            return result
+            
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            self._finish_trace(trace, error=str(e))
+            return _backend_error(e)
     
-    def query(self, question: str) -> Dict[str, Any]:
+    def query_stream(self,
+                     question: str,
+                     sources: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
         """
-        Query the loaded documents
+        Query the loaded documents, streaming the answer as it is generated
+        
+        Always answers in a single "stuff" LLM call (dropping the lowest
+        ranked chunks if they do not fit the context window), since that is
+        the only strategy whose output can be streamed from the first token.
         
         Args:
             question: User question
+            sources: Restrict retrieval to these document paths
             
-        Returns:
-            Dict with answer and sources
+        Yields:
+            Event dicts: {"type": "sources"} once retrieval finishes, then
+            {"type": "token"} per generated chunk and a final {"type": "done"}
+            with the full answer, timings and trace, or {"type": "error"}
         """
-        if not self.documents_loaded or not self.qa_chain:
-            return {
-                "success": False,
-                "error": "No documents loaded. Please load a PDF first."
+        if not self.documents_loaded or not self.retriever:
+            yield {
+                "type": "error",
+                "error": "No documents loaded. Please load a PDF first.",
+                "error_type": INVALID_REQUEST
             }
+            return
         
+        trace = Trace("rag.query", streaming=True)
         try:
-            # Get response with better prompt
-            enhanced_query = f"""
-            Please provide a clear, concise answer to the following question based on the document content.
-            Avoid repeating the same information multiple times.
+            started = time.perf_counter()
             
-            Question: {question}
-            """
+            query_vector = self._embed_question(question, trace)
+            cache_key = self._answer_cache_key(query_vector, sources, "stuff")
+            if cache_key:
+                with trace.span("answer_cache.lookup") as span:
+                    cached = self.answer_cache.lookup(*cache_key)
+                    span.set(hit=bool(cached))
+                if cached:
+                    yield {"type": "sources", "sources": cached["sources"], "num_sources": cached["num_sources"]}
+                    yield {"type": "token", "text": cached["answer"]}
+                    elapsed = round(time.perf_counter() - started, 4)
+                    yield {
+                        **{key: value for key, value in cached.items() if key != "success"},
+                        "type": "done",
+                        "cached": True,
+                        "timings": {"time_to_first_token_seconds": elapsed, "total_seconds": elapsed, "llm_calls": 0},
+                        "trace": self._finish_trace(trace, cached=True)
+                    }
+                    return
             
-            response = self.qa_chain({"query": enhanced_query})
+            documents = self._retrieve(question, sources, query_vector, trace)
+            retrieved = time.perf_counter()
             
-            # Extract and deduplicate sources
-            sources = []
-            seen_content = set()
+            with trace.span("postprocess", chunks=len(documents)) as span:
+                sources = self._format_sources(documents)
+                span.set(sources=len(sources), duplicates_removed=len(documents) - len(sources))
+            yield {"type": "sources", "sources": sources, "num_sources": len(sources)}
             
-            for doc in response.get("source_documents", []):
-                # Get a snippet of content for deduplication
-                content_snippet = doc.page_content[:100].strip()
+            with trace.span("prompt", chunks=len(documents)) as span:
+                enhanced_query = self._enhance_question(question)
+                documents = fit_to_context(documents, enhanced_query, self.context_window, self.answer_tokens)
                 
-                # Only add if we haven't seen similar content
-                if content_snippet not in seen_content:
-                    seen_content.add(content_snippet)
-                    sources.append({
-                        "content": doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content,
-                        "metadata": doc.metadata
-                    })
-            
-            return {
-                "success": True,
-                "answer": response["result"],
+                # Build the same prompt the stuff chain would send
+                chain = self._get_answer_chain("stuff")
+                context = chain.document_separator.join(
+                    format_document(doc, chain.document_prompt) for doc in documents
+                )
+                prompt = chain.llm_chain.prompt.format(
+                    **{chain.document_variable_name: context, "question": enhanced_query}
+                )
+                span.set(chunks_kept=len(documents))
+            
+            answer_parts = []
+            first_token = None
+            # Not a with block: the generator may be suspended at a yield
+            generate_span = trace.start_span("generate", chain_type="stuff")
+            llm_tracer = TracingCallbackHandler(trace, parent=generate_span)
+            try:
+                # The slot is held until the last token or until the consumer
+                # closes the stream
+                with self._generation_slot(generate_span):
+                    for token in self.llm.stream(prompt, config={"callbacks": [llm_tracer]}):
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                        answer_parts.append(token)
+                        yield {"type": "token", "text": token}
+            finally:
+                generate_span.end()
+            finished = time.perf_counter()
+            
+            result = {
+                "answer": "".join(answer_parts),
                 "sources": sources,
-                "num_sources": len(sources)
+                "num_sources": len(sources),
+                "chain_type": "stuff",
+                "cached": False,
+                "timings": {
+                    "retrieval_seconds": round(retrieved - started, 4),
+                    "time_to_first_token_seconds": round((first_token or finished) - started, 4),
+                    "generation_seconds": round(finished - retrieved, 4),
+                    "total_seconds": round(finished - started, 4),
+                    "llm_calls": 1,
+                    "prompt_tokens": llm_tracer.prompt_tokens,
+                    "completion_tokens": llm_tracer.completion_tokens,
+                }
             }
             
+            if cache_key:
+                self.answer_cache.store(*cache_key, {"success": True, **result})
+            
+            yield {"type": "done", **result, "trace": self._finish_trace(trace, cached=False)}
+            
         except Exception as e:
-            return {"success": False, "error": str(e)}
+            self._finish_trace(trace, error=str(e))
+            yield {"type": "error", "error": str(e), "error_type": BACKEND_ERROR}
     
+    @contextmanager
+    def _generation_slot(self, span) -> Iterator[None]:
+        """Hold one of the max_concurrent_generations LLM slots, if limited"""
+        if self._generation_slots is None:
+            yield
+            return
+        waiting = time.perf_counter()
+        # A semaphore, not a lock: a stream may resume on another thread
+        self._generation_slots.acquire()
+        span.set(queue_wait_ms=round((time.perf_counter() - waiting) * 1000, 3))
+        try:
+            yield
+        finally:
+            self._generation_slots.release()
     
+    def _embed_question(self, question: str, trace=NULL_TRACE) -> List[float]:
+        """Embed the question once for both the answer cache and dense retrieval"""
+        with trace.span("embed", chars=len(question)):
+            return self.embeddings.embed_query(question)
     
-    
\ No newline at end of file
+    def _finish_trace(self, trace: Trace, **attributes: Any) -> Dict[str, Any]:
+        """
+        End a query trace and hand it to the configured exporter
+        
+        Args:
+            trace: Trace of the finished query
+            attributes: Outcome attributes set on the trace root
+            
+        Returns:
+            Trace dict included in the response
+        """
+        trace.root.set(**attributes)
+        trace.end()
+        if self.trace_exporter:
+            try:
+                self.trace_exporter.export(trace)
+            except OSError as e:
+                # Losing a trace must never fail the query
+                print(f"Trace export failed: {e}")
+        return trace.to_dict()
+    
+    def _answer_cache_key(self,
+                          query_vector: List[float],
+                          sources: Optional[List[str]] = None,
+                          chain_type: str = "auto") -> Optional[Tuple[List[float], Tuple]]:
+        """
+        Answer cache lookup key for a question
+        
+        Args:
+            query_vector: Question embedding
+            sources: Document paths the query is restricted to
+            chain_type: Requested answer strategy; an explicit strategy is
+                only ever served answers produced with it
+            
+        Returns:
+            (question embedding, namespace) or None if caching is disabled
+        """
+        if not self.answer_cache:
+            return None
+        
+        # Answers are only valid for the collection state they were made from
+        source_key = tuple(sorted(os.path.abspath(source) for source in sources or []))
+        namespace = (self.collection_version, source_key, chain_type)
+        return query_vector, namespace
+    
+    def _retrieve(self,
+                  question: str,
+                  sources: Optional[List[str]] = None,
+                  query_vector: Optional[List[float]] = None,
+                  trace=NULL_TRACE) -> List[Document]:
+        """
+        Retrieve the chunks most relevant to a question
+        
+        Args:
+            question: User question
+            sources: Restrict retrieval to these document paths
+            query_vector: Question embedding, if already computed
+            trace: Trace the retrieval spans are recorded in
+            
+        Returns:
+            Retrieved chunks, best first
+        """
+        if sources:
+            sources = [os.path.abspath(source) for source in sources]
+        with trace.span("retrieve", top_k=self.top_k) as span:
+            documents = self.retriever.retrieve(question, sources, query_vector, trace)
+            span.set(chunks=len(documents))
+        return documents
+    
+    @staticmethod
+    def _enhance_question(question: str) -> str:
+        """Wrap the user question with answer-style instructions"""
+        # Get response with better prompt
+        return f"""
+            Please provide a clear, concise answer to the following question based on the document content.
+            Avoid repeating the same information multiple times.
+            
+            Question: {question}
+            """
+    
+    @staticmethod
+    def _format_sources(documents: List[Document]) -> List[Dict[str, Any]]:
+        """
+        Deduplicate retrieved chunks into source snippets
+        
+        Args:
+            documents: Retrieved chunks
+            
+        Returns:
+            List of dicts with content snippet and metadata
+        """
+        sources = []
+        seen_content = set()
+        
+        for doc in documents:
+            # Get a snippet of content for deduplication
+            content_snippet = doc.page_content[:100].strip()
+            
+            # Only add if we haven't seen similar content
+            if content_snippet not in seen_content:
+                seen_content.add(content_snippet)
+                sources.append({
+                    "content": doc.page_content[:300] + "..." if len(doc.page_content) > 300 else doc.page_content,
+                    "metadata": doc.metadata
+                })
+        
+        return sources
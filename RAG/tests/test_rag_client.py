@@ -0,0 +1,102 @@
+import os
+import sys
+
+RAG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAG_DIR)
+sys.path.insert(0, os.path.join(RAG_DIR, "benchmarks"))
+
+from fakes import FakeEmbeddings, FakeLLM  # noqa: E402
+from rag_client import RAGClient  # noqa: E402
+from synthetic_pdf import fact_sentence, write_pdf  # noqa: E402
+
+
+def make_client(tmp_path, pages=5, **kwargs):
+    pdf = str(tmp_path / "manual.pdf")
+    write_pdf(pdf, pages)
+    client = RAGClient(
+        persist_directory=str(tmp_path / "chroma_db"),
+        embeddings=FakeEmbeddings(),
+        llm=FakeLLM(),
+        **kwargs
+    )
+    loaded = client.load_pdf(pdf)
+    assert loaded["success"], loaded.get("error")
+    return client, pdf
+
+
+def test_default_query_answers_then_hits_the_answer_cache(tmp_path):
+    client, pdf = make_client(tmp_path)
+    question = fact_sentence(3)[0]
+
+    first = client.query(question)
+    assert first["success"], first.get("error")
+    assert not first["cached"]
+    assert first["sources"] and first["chain_type"] != "auto"
+
+    second = client.query(question)
+    assert second["success"] and second["cached"]
+    assert second["answer"] == first["answer"]
+
+    # "auto" also stored the answer under the strategy it picked
+    resolved = client.query(question, chain_type=first["chain_type"])
+    assert resolved["success"] and resolved["cached"]
+
+
+def test_query_with_source_filter(tmp_path):
+    client, pdf = make_client(tmp_path)
+    question = fact_sentence(1)[0]
+
+    result = client.query(question, sources=[pdf])
+    assert result["success"], result.get("error")
+    assert client.query(question, sources=[pdf])["cached"]
+    # A different filter is a different cache namespace
+    assert not client.query(question, sources=[str(tmp_path / "other.pdf")]).get("cached")
+
+
+def test_every_chain_type_runs_offline(tmp_path):
+    client, pdf = make_client(tmp_path, answer_cache_threshold=None)
+    question = fact_sentence(2)[0]
+
+    for chain_type in ("stuff", "map_reduce", "refine"):
+        result = client.query(question, chain_type=chain_type)
+        assert result["success"], (chain_type, result.get("error"))
+        assert result["chain_type"] == chain_type
+
+
+class FailingEmbeddings(FakeEmbeddings):
+    """Fails the embedding request after the first few ingestion batches"""
+
+    def __init__(self, fail_after: int):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def embed_documents(self, texts):
+        if self.fail_after <= 0:
+            raise RuntimeError("embedding backend went away")
+        self.fail_after -= 1
+        return super().embed_documents(texts)
+
+
+def test_failed_ingestion_leaves_no_orphan_chunks(tmp_path):
+    pdf = str(tmp_path / "manual.pdf")
+    write_pdf(pdf, 5)
+    embeddings = FailingEmbeddings(fail_after=2)
+    client = RAGClient(
+        persist_directory=str(tmp_path / "chroma_db"),
+        embeddings=embeddings,
+        llm=FakeLLM(),
+        embed_batch_size=4,
+        embed_workers=1
+    )
+
+    loaded = client.load_pdf(pdf)
+    assert not loaded["success"]
+    assert "went away" in loaded["error"]
+    assert client.vectorstore._collection.count() == 0
+    assert len(client.keyword_index) == 0
+
+    embeddings.fail_after = 1000
+    loaded = client.load_pdf(pdf)
+    assert loaded["success"], loaded.get("error")
+    assert client.vectorstore._collection.count() == loaded["chunks_added"]
+    assert len(client.keyword_index) == loaded["chunks_added"]
@@ -0,0 +1,278 @@
+"""
+Per-query tracing: timed spans for each stage of a RAG query
+
+A Trace collects spans (embed, retrieve, each LLM call, post-processing)
+with their attributes, is returned in the query response and can be
+appended to a local JSONL or OTLP/JSON file for offline analysis.
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from answer_strategy import LLMCallCounter, estimate_tokens
+
+TRACE_FORMATS = ("jsonl", "otlp")
+
+
+class Span:
+    """One timed stage of a trace"""
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.duration_ms: Optional[float] = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes: Any):
+        """Add or overwrite attributes"""
+        self.attributes.update(attributes)
+
+    def end(self):
+        """Stop the clock; later calls keep the first duration"""
+        if self.duration_ms is None:
+            self.duration_ms = round((time.perf_counter() - self._started) * 1000, 3)
+
+    @property
+    def end_ns(self) -> int:
+        return self.start_ns + int((self.duration_ms or 0.0) * 1_000_000)
+
+    def to_dict(self, trace_start_ns: int) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ms": round((self.start_ns - trace_start_ns) / 1_000_000, 3),
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+
+
+class Trace:
+    """
+    Spans recorded while serving one query
+
+    Spans opened with span() nest under the span currently open on the same
+    thread; work handed to another thread passes parent explicitly.
+    """
+
+    def __init__(self, name: str, **attributes: Any):
+        self.trace_id = secrets.token_hex(16)
+        self.root = Span(name, None, attributes)
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def current(self) -> Span:
+        """Innermost span open on this thread (the root if none)"""
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else self.root
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """Open a span that the caller ends explicitly"""
+        span = Span(name, (parent or self.current()).span_id, attributes)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Iterator[Span]:
+        """Time the enclosed block as a span"""
+        span = self.start_span(name, parent, **attributes)
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        self._local.stack.append(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set(error=str(e))
+            raise
+        finally:
+            self._local.stack.pop()
+            span.end()
+
+    def end(self):
+        self.root.end()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable trace; span start_ms is relative to the trace start"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start_ns)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.root.name,
+            "start_time": self.root.start_ns / 1_000_000_000,
+            "duration_ms": self.root.duration_ms,
+            "attributes": self.root.attributes,
+            "spans": [span.to_dict(self.root.start_ns) for span in spans],
+        }
+
+
+class _NullSpan:
+    def set(self, **attributes: Any):
+        pass
+
+
+class NullTrace:
+    """Stand-in for callers that do not trace; records nothing"""
+
+    _span = _NullSpan()
+
+    def current(self) -> None:
+        return None
+
+    @contextmanager
+    def span(self, name: str, parent: Any = None, **attributes: Any) -> Iterator[_NullSpan]:
+        yield self._span
+
+
+NULL_TRACE = NullTrace()
+
+
+class TracingCallbackHandler(LLMCallCounter):
+    """
+    Records one span per LLM call made by a chain or a streamed generation
+
+    Token counts come from Ollama's prompt_eval_count / eval_count when the
+    response carries them, otherwise they are estimated from the text.
+    """
+
+    def __init__(self, trace: Trace, parent: Optional[Span] = None):
+        super().__init__()
+        self.trace = trace
+        self.parent = parent
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._calls: Dict[Any, tuple] = {}
+
+    def on_llm_start(self, serialized: Any, prompts: List[str], **kwargs: Any) -> None:
+        super().on_llm_start(serialized, prompts, **kwargs)
+        span = self.trace.start_span("llm", parent=self.parent, call=self.llm_calls)
+        self._calls[kwargs.get("run_id")] = (span, prompts)
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        call = self._calls.get(kwargs.get("run_id"))
+        if call and "time_to_first_token_ms" not in call[0].attributes:
+            span = call[0]
+            span.set(time_to_first_token_ms=round((time.perf_counter() - span._started) * 1000, 3))
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        call = self._calls.pop(kwargs.get("run_id"), None)
+        if call is None:
+            return
+        span, prompts = call
+
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        info = (generation.generation_info or {}) if generation else {}
+        prompt_tokens = info.get("prompt_eval_count")
+        completion_tokens = info.get("eval_count")
+        if prompt_tokens is not None and completion_tokens is not None:
+            source = "ollama"
+        else:
+            source = "estimate"
+            prompt_tokens = sum(estimate_tokens(prompt) for prompt in prompts)
+            completion_tokens = estimate_tokens(generation.text) if generation else 0
+
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, token_source=source)
+        span.end()
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        call = self._calls.pop(kwargs.get("run_id"), None)
+        if call is not None:
+            call[0].set(error=str(error))
+            call[0].end()
+
+
+class JSONLTraceExporter:
+    """Appends each trace as one JSON line (the to_dict form)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _line(self, trace: Trace) -> Dict[str, Any]:
+        return trace.to_dict()
+
+    def export(self, trace: Trace):
+        line = json.dumps(self._line(trace), default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPJSONTraceExporter(JSONLTraceExporter):
+    """
+    Appends each trace as one OTLP/JSON ExportTraceServiceRequest line
+
+    The file can be replayed into an OpenTelemetry Collector with its
+    otlpjsonfile receiver, or read by any tool that accepts OTLP/JSON.
+    """
+
+    def __init__(self, path: str, service_name: str = "rag-client"):
+        super().__init__(path)
+        self.service_name = service_name
+
+    def _line(self, trace: Trace) -> Dict[str, Any]:
+        spans = []
+        for span in [trace.root] + sorted(trace.spans, key=lambda span: span.start_ns):
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [
+                    {"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()
+                ],
+                "status": {"code": 2, "message": str(span.attributes["error"])} if "error" in span.attributes else {},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]
+                },
+                "scopeSpans": [{"scope": {"name": "rag_client"}, "spans": spans}],
+            }]
+        }
+
+
+def create_trace_exporter(path: Optional[str], trace_format: str = "jsonl"):
+    """
+    Exporter for a trace file, or None if path is not set
+
+    Args:
+        path: File traces are appended to
+        trace_format: "jsonl" (trace dicts) or "otlp" (OTLP/JSON)
+
+    Returns:
+        Exporter with an export(trace) method, or None
+    """
+    if not path:
+        return None
+    if trace_format == "jsonl":
+        return JSONLTraceExporter(path)
+    if trace_format == "otlp":
+        return OTLPJSONTraceExporter(path)
+    raise ValueError(f"Unknown trace format: {trace_format} (expected one of {', '.join(TRACE_FORMATS)})")
@@ -0,0 +1,67 @@
+# Per-node checkpoints for resumable workflow runs
+#
+# A checkpoint stores a node's outputs under a hash of the node's name,
+# version and input values. Because upstream outputs are downstream inputs,
+# a change anywhere invalidates exactly the nodes after it.
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Optional
+
+CHECKPOINT_DB = os.environ.get(
+    "SOCIAL_CHECKPOINT_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".checkpoints.sqlite3")
+)
+
+
+def input_hash(node_name: str, version: int, inputs: Dict[str, Any]) -> str:
+    """Content address of a node invocation"""
+    payload = json.dumps({"node": node_name, "version": version, "inputs": inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CheckpointStore:
+    """SQLite table of node outputs keyed by (node, input hash)"""
+
+    def __init__(self, path: str = CHECKPOINT_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " node TEXT NOT NULL,"
+            " input_hash TEXT NOT NULL,"
+            " outputs TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (node, input_hash))"
+        )
+        self._conn.commit()
+
+    def load(self, node: str, key: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Outputs saved for these inputs, or None (also if older than max_age seconds)"""
+        row = self._conn.execute(
+            "SELECT outputs, created_at FROM checkpoints WHERE node = ? AND input_hash = ?", (node, key)
+        ).fetchone()
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    def save(self, node: str, key: str, outputs: Dict[str, Any]):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (node, input_hash, outputs, created_at) VALUES (?, ?, ?, ?)",
+                (node, key, json.dumps(outputs), time.time())
+            )
+
+    def clear(self, nodes: Optional[Iterable[str]] = None):
+        """Drop checkpoints for some nodes, or all of them"""
+        with self._conn:
+            if nodes is None:
+                self._conn.execute("DELETE FROM checkpoints")
+            else:
+                self._conn.executemany("DELETE FROM checkpoints WHERE node = ?", [(node,) for node in nodes])
+
+    def close(self):
+        self._conn.close()
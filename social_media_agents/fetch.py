@@ -0,0 +1,234 @@
+# Shared fetch layer for the agents' external API calls
+#
+# HttpFetcher: on-disk response cache (TTL + conditional requests), per-host
+# token-bucket rate limiting and retry with backoff.
+# FixtureFetcher: serves canned responses from disk so the workflow runs offline.
+#
+# Select with SOCIAL_FETCH_BACKEND=http (default) or fixtures.
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode, urlsplit
+
+import httpx
+
+FETCH_BACKEND = os.environ.get("SOCIAL_FETCH_BACKEND", "http")
+CACHE_DIR = os.environ.get("SOCIAL_FETCH_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".fetch_cache"))
+CACHE_TTL = float(os.environ.get("SOCIAL_FETCH_CACHE_TTL", "3600"))
+FIXTURES_DIR = os.environ.get("SOCIAL_FETCH_FIXTURES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 1.0
+# Longest wait honored from Retry-After / X-RateLimit-Reset
+MAX_BACKOFF_SECONDS = 60.0
+
+# Requests per second and burst size per host; GitHub allows 10 unauthenticated searches a minute
+RATE_LIMITS = {
+    "api.github.com": (10 / 60, 3),
+    "api.duckduckgo.com": (1.0, 2),
+}
+DEFAULT_RATE_LIMIT = (2.0, 4)
+
+
+@dataclass
+class FetchResult:
+    status: int
+    data: Any
+    # "network", "cache", "revalidated", "stale" or "fixture"
+    source: str
+
+
+def cache_key(url: str, params: Optional[dict] = None) -> str:
+    query = urlencode(sorted((params or {}).items()))
+    return hashlib.sha256(f"{url}?{query}".encode()).hexdigest()
+
+
+class TokenBucket:
+    """Async token bucket: rate tokens per second, up to capacity saved up"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so the next request waits at least this long"""
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+        self.updated = time.monotonic()
+
+
+class DiskCache:
+    """JSON response cache, one file per request key"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+
+class HttpFetcher:
+    """Cached, rate-limited, retrying JSON GETs over a shared HTTP session"""
+
+    def __init__(self, session: httpx.AsyncClient, cache_dir: str = CACHE_DIR, ttl: float = CACHE_TTL,
+                 rate_limits: Dict[str, tuple] = RATE_LIMITS, max_retries: int = MAX_RETRIES,
+                 backoff_seconds: float = BACKOFF_SECONDS):
+        self.session = session
+        self.cache = DiskCache(cache_dir)
+        self.ttl = ttl
+        self.rate_limits = rate_limits
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.headers = {}
+        # Authenticated GitHub requests get a much higher rate limit
+        if os.environ.get("GITHUB_TOKEN"):
+            self.headers["api.github.com"] = {"Authorization": f"Bearer {os.environ['GITHUB_TOKEN']}"}
+
+    def _bucket(self, host: str) -> TokenBucket:
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(*self.rate_limits.get(host, DEFAULT_RATE_LIMIT))
+        return self.buckets[host]
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        if "Retry-After" in response.headers:
+            try:
+                return float(response.headers["Retry-After"])
+            except ValueError:
+                return None
+        if response.headers.get("X-RateLimit-Remaining") == "0" and "X-RateLimit-Reset" in response.headers:
+            return max(0.0, float(response.headers["X-RateLimit-Reset"]) - time.time())
+        return None
+
+    async def get_json(self, url: str, params: Optional[dict] = None) -> FetchResult:
+        key = cache_key(url, params)
+        cached = self.cache.get(key)
+        if cached and time.time() - cached["fetched_at"] < self.ttl:
+            return FetchResult(cached["status"], cached["data"], "cache")
+
+        host = urlsplit(url).hostname
+        headers = dict(self.headers.get(host, {}))
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        bucket = self._bucket(host)
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            wait = None
+            try:
+                response = await self.session.get(url, params=params, headers=headers)
+            except httpx.TransportError:
+                response = None
+            else:
+                if response.status_code == 304 and cached:
+                    cached["fetched_at"] = time.time()
+                    self.cache.put(key, cached)
+                    return FetchResult(cached["status"], cached["data"], "revalidated")
+                throttled = response.status_code == 429 or (
+                    response.status_code == 403 and response.headers.get("X-RateLimit-Remaining") == "0"
+                )
+                if response.status_code == 200:
+                    data = response.json()
+                    self.cache.put(key, {
+                        "url": url,
+                        "params": params,
+                        "status": 200,
+                        "data": data,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                        "fetched_at": time.time(),
+                    })
+                    return FetchResult(200, data, "network")
+                if not throttled and response.status_code < 500:
+                    return FetchResult(response.status_code, None, "network")
+                wait = self._retry_after(response)
+                if throttled and wait is not None:
+                    # Every request to this host waits, not just this one
+                    bucket.pause(min(wait, MAX_BACKOFF_SECONDS))
+                    wait = 0
+
+            if attempt >= self.max_retries:
+                if cached:
+                    # Better an old answer than none
+                    return FetchResult(cached["status"], cached["data"], "stale")
+                if response is None:
+                    raise httpx.ConnectError(f"Could not reach {host}")
+                return FetchResult(response.status_code, None, "network")
+
+            attempt += 1
+            if wait is None:
+                delay = self.backoff_seconds * (2 ** (attempt - 1))
+                wait = delay + random.uniform(0, delay)
+            await asyncio.sleep(min(wait, MAX_BACKOFF_SECONDS))
+
+
+class FixtureFetcher:
+    """Serves responses from fixture files instead of the network
+
+    Looks for fixtures/<host>/<cache key>.json, then fixtures/<host>/default.json.
+    A fixture is {"status": ..., "data": ..., "latency": seconds}; latency
+    simulates network time for offline benchmarks.
+    """
+
+    def __init__(self, fixtures_dir: str = FIXTURES_DIR, latency: Optional[float] = None):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+
+    async def get_json(self, url: str, params: Optional[dict] = None) -> FetchResult:
+        host_dir = os.path.join(self.fixtures_dir, urlsplit(url).hostname)
+        for name in (cache_key(url, params), "default"):
+            path = os.path.join(host_dir, f"{name}.json")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    fixture = json.load(f)
+                latency = self.latency if self.latency is not None else fixture.get("latency", 0)
+                if latency:
+                    await asyncio.sleep(latency)
+                return FetchResult(fixture.get("status", 200), fixture.get("data"), "fixture")
+        return FetchResult(404, None, "fixture")
+
+
+def create_fetcher(session: httpx.AsyncClient, backend: str = FETCH_BACKEND):
+    """Fetcher for the configured backend (http or fixtures)"""
+    if backend == "fixtures":
+        return FixtureFetcher()
+    if backend == "http":
+        return HttpFetcher(session)
+    raise ValueError(f"Unknown SOCIAL_FETCH_BACKEND: {backend}")
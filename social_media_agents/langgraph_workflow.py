@@ -1,94 +1,404 @@
 # LangGraph-based workflow for social media content research, writing, and publishing
-# Install langgraph: pip install langgraph
+# Install langgraph: pip install langgraph httpx
+# External lookups go through fetch.py; set SOCIAL_FETCH_BACKEND=fixtures to run offline
 
+import abc
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
 from langgraph import Workflow, Node, Context
 
-# Agent Nodes
-class ResearchAgent(Node):
+from checkpoint import CheckpointStore, input_hash
+from fetch import CACHE_TTL, create_fetcher
+from output_sink import ArticleStream, RunOutputSink, new_run_id, read_articles
+
+# Seconds before a web lookup is abandoned
+HTTP_TIMEOUT = 10.0
+
+
+async def _timed(coro, timings, key):
+    """Await coro and record how long it took under timings[key]"""
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[key] = round(time.perf_counter() - started, 3)
+
+
+class ParallelNode(Node, abc.ABC):
+    """Node whose tasks are independent and run concurrently
+
+    Subclasses implement run_task (one task, may use the shared fetcher
+    for external APIs). finish stores the results, in task order, under the
+    first output key; override it to store them differently.
+    input_keys/output_keys name the context entries the node reads and
+    writes; they define its checkpoint. Bump version when its logic changes.
+    Tasks listed in fetch_tasks call external APIs, so a checkpoint of a run
+    that includes them expires with the fetch cache TTL.
+
+    A producer sets stream_key; a consumer naming it in streams_from starts
+    together with it and reads its output while it is being produced. The
+    consumer must detach from the stream when it stops reading, or the
+    producer blocks once the buffer is full.
+    """
+    tasks_key = None
+    default_tasks = []
+    input_keys = ()
+    output_keys = ()
+    version = 1
+    stream_key = None
+    streams_from = None
+    fetch_tasks = ()
+
+    @abc.abstractmethod
+    async def run_task(self, task, ctx, fetcher):
+        """Run one task and return its result"""
+
+    def finish(self, ctx, results):
+        ctx[self.output_keys[0]] = results
+        return ctx
+
+    def max_age(self, ctx):
+        """Seconds a checkpoint of this run stays valid, or None while its inputs are unchanged"""
+        if any(task in self.fetch_tasks for task in ctx.get(self.tasks_key, self.default_tasks)):
+            return CACHE_TTL
+        return None
+
+    def consumes_stream(self, ctx):
+        """Whether this run of a streams_from consumer reads the producer's stream"""
+        return self.streams_from is not None
+
+    def restorable(self, outputs):
+        """Whether checkpointed outputs are still usable"""
+        return True
+
+    async def arun(self, ctx, fetcher):
+        tasks = ctx.get(self.tasks_key, self.default_tasks)
+        timings = {}
+        results = await asyncio.gather(*(
+            _timed(self.run_task(task, ctx, fetcher), timings, task) for task in tasks
+        ))
+        ctx['task_timings'] = {**ctx.get('task_timings', {}), type(self).__name__: timings}
+        return self.finish(ctx, list(results))
+
     def run(self, ctx: Context):
-        import requests
-        research_tasks = ctx.get('research_tasks', ["Find trending topics"])
-        results = []
-        for task in research_tasks:
-            if task == "Find trending topics":
-                results.append(["AI in Marketing", "Remote Work Trends", "Sustainable Business"])
-            elif task == "Analyze competitors":
-                results.append(["Competitor A: High engagement", "Competitor B: New campaign"])
-            elif task == "Web search":
-                # Example: Use DuckDuckGo Instant Answer API (no key required)
-                query = ctx.get('web_query', 'AI trends')
-                response = requests.get(f"https://api.duckduckgo.com/?q={query}&format=json")
-                if response.status_code == 200:
-                    data = response.json()
-                    abstract = data.get('Abstract', 'No summary found.')
-                    results.append([f"Web search result for '{query}': {abstract}"])
-                else:
-                    results.append([f"Web search failed for '{query}'."])
-            else:
-                results.append([f"Result for {task}"])
+        # Entry point for Workflow.run: one event loop and session per node
+        async def run_alone():
+            async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as session:
+                return await self.arun(ctx, create_fetcher(session))
+        return asyncio.run(run_alone())
+
+
+# Agent Nodes
+class ResearchAgent(ParallelNode):
+    tasks_key = 'research_tasks'
+    default_tasks = ["Find trending topics"]
+    input_keys = ('research_tasks', 'web_query')
+    output_keys = ('research_results',)
+    fetch_tasks = ("Web search",)
+
+    async def run_task(self, task, ctx, fetcher):
+        if task == "Find trending topics":
+            return ["AI in Marketing", "Remote Work Trends", "Sustainable Business"]
+        elif task == "Analyze competitors":
+            return ["Competitor A: High engagement", "Competitor B: New campaign"]
+        elif task == "Web search":
+            # Example: Use DuckDuckGo Instant Answer API (no key required)
+            query = ctx.get('web_query', 'AI trends')
+            try:
+                response = await fetcher.get_json("https://api.duckduckgo.com/", {"q": query, "format": "json"})
+            except httpx.HTTPError:
+                return [f"Web search failed for '{query}'."]
+            if response.status == 200:
+                abstract = response.data.get('Abstract', 'No summary found.')
+                return [f"Web search result for '{query}': {abstract}"]
+            return [f"Web search failed for '{query}'."]
+        return [f"Result for {task}"]
+
+    def finish(self, ctx, results):
         ctx['research_results'] = results
         print("ResearchAgent: Results", results)
         return ctx
 
-class WritingAgent(Node):
-    def run(self, ctx: Context):
-        import requests
-        writing_tasks = ctx.get('writing_tasks', ["Write articles"])
-        articles = []
-        for task in writing_tasks:
-            if task == "Write articles":
-                topics = ctx.get('research_results', [[]])[0]
-                for topic in topics:
-                    articles.append(f"Article about {topic}:\nThis is a sample article discussing {topic}.")
-            elif task == "Summarize research":
-                summary = "Summary: " + ", ".join(str(r) for r in ctx.get('research_results', []))
-                articles.append(summary)
-            elif task == "GitHub search":
-                # Example: Search GitHub repositories using GitHub API
-                response = requests.get("https://api.github.com/search/repositories?q=langgraph")
-                if response.status_code == 200:
-                    data = response.json()
-                    repo_names = [item['full_name'] for item in data.get('items', [])]
-                    articles.append(f"GitHub Search Results for 'langgraph':\n" + "\n".join(repo_names))
-                else:
-                    articles.append("GitHub search failed.")
-            else:
-                articles.append(f"Result for writing task: {task}")
-        ctx['articles'] = articles
-        # Write results to MDX file
-        with open("output.mdx", "w") as f:
-            for article in articles:
-                f.write(f"{article}\n\n")
-        print("WritingAgent: Articles/Summaries written and GitHub results saved to output.mdx")
+class WritingAgent(ParallelNode):
+    tasks_key = 'writing_tasks'
+    default_tasks = ["Write articles"]
+    input_keys = ('writing_tasks', 'research_results')
+    output_keys = ('articles_path', 'articles_digest', 'articles_count')
+    version = 2
+    stream_key = 'article_stream'
+    fetch_tasks = ("GitHub search",)
+
+    async def run_task(self, task, ctx, fetcher):
+        if task == "Write articles":
+            topics = ctx.get('research_results', [[]])[0]
+            # Generated lazily, one article at a time
+            return (f"Article about {topic}:\nThis is a sample article discussing {topic}." for topic in topics)
+        elif task == "Summarize research":
+            return ["Summary: " + ", ".join(str(r) for r in ctx.get('research_results', []))]
+        elif task == "GitHub search":
+            # Example: Search GitHub repositories using GitHub API
+            try:
+                response = await fetcher.get_json("https://api.github.com/search/repositories", {"q": "langgraph"})
+            except httpx.HTTPError:
+                return ["GitHub search failed."]
+            if response.status == 200:
+                repo_names = [item['full_name'] for item in response.data.get('items', [])]
+                return [f"GitHub Search Results for 'langgraph':\n" + "\n".join(repo_names)]
+            return ["GitHub search failed."]
+        return [f"Result for writing task: {task}"]
+
+    async def arun(self, ctx, fetcher):
+        tasks = ctx.get(self.tasks_key, self.default_tasks)
+        timings = {}
+        # Tasks still run concurrently, but articles are emitted in task order
+        # as soon as a task and all tasks before it are done
+        pending = [
+            asyncio.ensure_future(_timed(self.run_task(task, ctx, fetcher), timings, task)) for task in tasks
+        ]
+        stream = ctx.get(self.stream_key)
+        if not ctx.get('run_id'):
+            ctx['run_id'] = new_run_id()
+
+        try:
+            with RunOutputSink(ctx['run_id']) as sink:
+                for future in pending:
+                    for article in await future:
+                        sink.write(article)
+                        if stream is not None:
+                            await stream.put(article)
+        except BaseException as e:
+            for future in pending:
+                future.cancel()
+            if stream is not None:
+                stream.close(e)
+            raise
+
+        ctx['articles_path'] = sink.path
+        ctx['articles_digest'] = sink.digest
+        ctx['articles_count'] = sink.count
+        if stream is not None:
+            stream.close()
+            ctx[self.stream_key] = None
+        ctx['task_timings'] = {**ctx.get('task_timings', {}), type(self).__name__: timings}
+        print(f"WritingAgent: {sink.count} articles/summaries written to {sink.path}")
         return ctx
 
-class PublishingAgent(Node):
-    def run(self, ctx: Context):
+    def restorable(self, outputs):
+        return os.path.exists(outputs['articles_path'])
+
+
+async def iter_articles(ctx):
+    """Articles from the live writer stream, or from the run file once written"""
+    stream = ctx.get('article_stream')
+    if stream is None:
+        if ctx.get('articles_path'):
+            for article in read_articles(ctx['articles_path']):
+                yield article
+        return
+    try:
+        async for article in stream:
+            yield article
+    finally:
+        # Never leave the writer blocked on a consumer that stopped early
+        stream.detach()
+
+class PublishingAgent(ParallelNode):
+    tasks_key = 'publishing_tasks'
+    default_tasks = ["Publish to LinkedIn"]
+    input_keys = ('publishing_tasks', 'articles_digest')
+    output_keys = ('published',)
+    version = 2
+    streams_from = 'writing'
+    # Tasks that handle every article; they share a single pass over the articles
+    article_tasks = ("Publish to LinkedIn",)
+
+    def consumes_stream(self, ctx):
+        return any(task in self.article_tasks for task in ctx.get(self.tasks_key, self.default_tasks))
+
+    def publish(self, task, article):
+        if task == "Publish to LinkedIn":
+            print("PublishingAgent: Publishing article to LinkedIn...")
+            print(article)
+
+    async def publish_articles(self, ctx, tasks):
+        # The stream has one reader, so several article tasks never split the articles
+        async for article in iter_articles(ctx):
+            for task in tasks:
+                self.publish(task, article)
+
+    async def run_task(self, task, ctx, fetcher):
         # Handle multiple publishing tasks
-        publishing_tasks = ctx.get('publishing_tasks', ["Publish to LinkedIn"])
-        for task in publishing_tasks:
-            if task == "Publish to LinkedIn":
-                for article in ctx.get('articles', []):
-                    print("PublishingAgent: Publishing article to LinkedIn...")
-                    print(article)
-            elif task == "Schedule posts":
-                print("PublishingAgent: Scheduling posts...")
-            else:
-                print(f"PublishingAgent: Handling publishing task: {task}")
+        if task == "Schedule posts":
+            print("PublishingAgent: Scheduling posts...")
+        else:
+            print(f"PublishingAgent: Handling publishing task: {task}")
+
+    async def arun(self, ctx, fetcher):
+        tasks = ctx.get(self.tasks_key, self.default_tasks)
+        readers = [task for task in tasks if task in self.article_tasks]
+        stream = ctx.get('article_stream')
+        timings = {}
+        jobs = [_timed(self.run_task(task, ctx, fetcher), timings, task) for task in tasks if task not in readers]
+        if readers:
+            jobs.append(_timed(self.publish_articles(ctx, readers), timings, " + ".join(readers)))
+        try:
+            results = await asyncio.gather(*jobs)
+        finally:
+            # Never leave the writer blocked on a stream nobody reads
+            if stream is not None:
+                stream.detach()
+        ctx['task_timings'] = {**ctx.get('task_timings', {}), type(self).__name__: timings}
+        return self.finish(ctx, list(results))
+
+    def finish(self, ctx, results):
         ctx['published'] = True
         return ctx
 
+NODES = {
+    'research': ResearchAgent(),
+    'writing': WritingAgent(),
+    'publishing': PublishingAgent(),
+}
+EDGES = [('research', 'writing'), ('writing', 'publishing')]
+
 # Orchestrate workflow
 workflow = Workflow()
-workflow.add_node('research', ResearchAgent())
-workflow.add_node('writing', WritingAgent())
-workflow.add_node('publishing', PublishingAgent())
-workflow.add_edge('research', 'writing')
-workflow.add_edge('writing', 'publishing')
+for name, node in NODES.items():
+    workflow.add_node(name, node)
+for source, target in EDGES:
+    workflow.add_edge(source, target)
+
+
+def _node_key(name, node, ctx):
+    return input_hash(name, node.version, {k: ctx.get(k) for k in node.input_keys})
+
+
+def _restore(name, node, ctx, checkpoints):
+    """Restore a node's outputs if it already ran on the same inputs recently enough"""
+    if checkpoints is None:
+        return False
+    outputs = checkpoints.load(name, _node_key(name, node, ctx), max_age=node.max_age(ctx))
+    if outputs is None or not node.restorable(outputs):
+        return False
+    for k, value in outputs.items():
+        ctx[k] = value
+    ctx['skipped_nodes'] = ctx.get('skipped_nodes', []) + [name]
+    print(f"Checkpoint: inputs of '{name}' unchanged, skipping")
+    return True
+
+
+async def _run_node(name, node, ctx, fetcher, checkpoints):
+    await node.arun(ctx, fetcher)
+    if checkpoints is not None:
+        # Keyed on the final inputs: a streaming consumer only learns them at the end
+        checkpoints.save(name, _node_key(name, node, ctx), {k: ctx[k] for k in node.output_keys if k in ctx})
+    return ctx
+
+
+async def run_workflow(ctx, nodes=NODES, edges=EDGES, checkpoints=None):
+    """
+    Run the node DAG on one event loop and one shared HTTP session/fetcher
+
+    Every node whose predecessors have finished starts immediately, so
+    independent nodes overlap; inside a node, tasks run concurrently.
+    Timings (seconds) are stored in ctx['node_timings'] and ctx['task_timings'].
+
+    With a CheckpointStore, each finished node's outputs are saved under a
+    hash of its inputs, and nodes whose inputs are unchanged since an
+    earlier run are skipped (listed in ctx['skipped_nodes']). A rerun after
+    a failure therefore resumes at the failed node. Checkpoints of nodes
+    that fetched external data expire after the fetch cache TTL.
+
+    A node whose streams_from producer starts live is launched alongside
+    it and consumes its stream, so e.g. publishing overlaps with writing.
+    """
+    predecessors = {name: set() for name in nodes}
+    for source, target in edges:
+        predecessors[target].add(source)
+
+    node_timings = {}
+    done = set()
+    running = {}
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as session:
+        fetcher = create_fetcher(session)
+
+        def launch(name):
+            running[name] = asyncio.create_task(
+                _timed(_run_node(name, nodes[name], ctx, fetcher, checkpoints), node_timings, name)
+            )
+
+        while len(done) < len(nodes):
+            launched = True
+            while launched:
+                launched = False
+                for name, node in nodes.items():
+                    if name in done or name in running:
+                        continue
+                    waiting_on = predecessors[name] - done
+                    source = node.streams_from
+                    if source in running and waiting_on == {source} and ctx.get(nodes[source].stream_key):
+                        launch(name)
+                        launched = True
+                    elif not waiting_on:
+                        if _restore(name, node, ctx, checkpoints):
+                            node_timings[name] = 0.0
+                            done.add(name)
+                        else:
+                            if node.stream_key and any(
+                                other.streams_from == name and other_name not in done
+                                and predecessors[other_name] - {name} <= done
+                                and other.consumes_stream(ctx)
+                                for other_name, other in nodes.items()
+                            ):
+                                ctx[node.stream_key] = ArticleStream()
+                            launch(name)
+                        launched = True
+            if len(done) == len(nodes):
+                break
+            if not running:
+                raise ValueError("Workflow graph has a cycle")
+            finished, _ = await asyncio.wait(running.values(), return_when=asyncio.FIRST_COMPLETED)
+            for name, task in list(running.items()):
+                if task in finished:
+                    del running[name]
+                    if task.exception() is not None:
+                        # Let nodes already in flight finish so their checkpoints are saved
+                        await asyncio.gather(*running.values(), return_exceptions=True)
+                        raise task.exception()
+                    done.add(name)
+
+    node_timings['total'] = round(time.perf_counter() - started, 3)
+    ctx['node_timings'] = node_timings
+    return ctx
+
+
+def print_timings(ctx):
+    print("\nTimings (s)")
+    for name, seconds in ctx.get('node_timings', {}).items():
+        print(f"  {name:<12}{seconds:>8}")
+    for node, timings in ctx.get('task_timings', {}).items():
+        for task, seconds in timings.items():
+            print(f"    {node}/{task}: {seconds}")
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Social media research/writing/publishing workflow")
+    parser.add_argument("--fresh", action="store_true", help="Ignore checkpoints and rerun every node")
+    parser.add_argument("--no-checkpoints", action="store_true", help="Do not read or write checkpoints")
+    args = parser.parse_args()
+
+    checkpoints = None if args.no_checkpoints else CheckpointStore()
+    if checkpoints is not None and args.fresh:
+        checkpoints.clear()
+
     ctx = Context()
     ctx['research_tasks'] = ["Find trending topics", "Analyze competitors"]
     ctx['writing_tasks'] = ["Write articles", "Summarize research"]
     ctx['publishing_tasks'] = ["Publish to LinkedIn", "Schedule posts"]
-    workflow.run('research', ctx)
+    asyncio.run(run_workflow(ctx, checkpoints=checkpoints))
+    print_timings(ctx)
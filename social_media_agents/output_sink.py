@@ -0,0 +1,122 @@
+# Streaming article output: a per-run MDX file written atomically, and an
+# in-memory stream that lets publishing consume articles while they are written
+
+import asyncio
+import hashlib
+import os
+import time
+import uuid
+from collections import deque
+
+OUTPUT_DIR = os.environ.get("SOCIAL_OUTPUT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "output"))
+# Articles buffered between the writer and the publisher
+STREAM_BUFFER = 64
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+
+
+class RunOutputSink:
+    """Appends articles to output/<run_id>.mdx as they are produced
+
+    Writes go to a .tmp file that is renamed into place only when the run
+    succeeds, so readers never see a partial file and concurrent runs never
+    share one. A sidecar .index file holds each entry's byte length so
+    read_articles can split the file back into articles exactly.
+    """
+
+    def __init__(self, run_id: str, directory: str = OUTPUT_DIR):
+        self.run_id = run_id
+        self.path = os.path.join(directory, f"{run_id}.mdx")
+        self.index_path = self.path + ".index"
+        self.count = 0
+        self._hash = hashlib.sha256()
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path + ".tmp", "wb")
+        self._index = open(self.index_path + ".tmp", "w", encoding="utf-8")
+        return self
+
+    def write(self, article: str):
+        entry = f"{article}\n\n".encode("utf-8")
+        self._file.write(entry)
+        self._index.write(f"{len(entry)}\n")
+        self._hash.update(entry)
+        self.count += 1
+
+    @property
+    def digest(self) -> str:
+        return self._hash.hexdigest()
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        self._index.close()
+        if exc_type is not None:
+            os.remove(self.path + ".tmp")
+            os.remove(self.index_path + ".tmp")
+            return False
+        os.replace(self.index_path + ".tmp", self.index_path)
+        os.replace(self.path + ".tmp", self.path)
+        return False
+
+
+def read_articles(path: str):
+    """Yield the articles of a committed run file one at a time"""
+    with open(path + ".index", "r", encoding="utf-8") as index, open(path, "rb") as f:
+        for line in index:
+            yield f.read(int(line)).decode("utf-8")[:-2]
+
+
+class ArticleStream:
+    """Bounded buffer of articles from one producer to one consumer
+
+    put blocks while the buffer is full, so a slow publisher bounds the
+    writer's memory instead of letting articles pile up.
+    """
+
+    def __init__(self, maxsize: int = STREAM_BUFFER):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+        self._closed = False
+        self._detached = False
+        self._error = None
+
+    async def put(self, article: str):
+        while len(self._items) >= self.maxsize and not self._detached:
+            self._writable.clear()
+            await self._writable.wait()
+        if not self._detached:
+            self._items.append(article)
+            self._readable.set()
+
+    def close(self, error: BaseException = None):
+        """Signal the end of the stream; error is re-raised in the consumer"""
+        self._closed = True
+        self._error = error
+        self._readable.set()
+
+    def detach(self):
+        """Consumer gives up: drop buffered articles and stop blocking the producer"""
+        self._detached = True
+        self._items.clear()
+        self._writable.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        while not self._items:
+            if self._closed:
+                if self._error is not None:
+                    raise RuntimeError("Article producer failed") from self._error
+                raise StopAsyncIteration
+            self._readable.clear()
+            await self._readable.wait()
+        article = self._items.popleft()
+        self._writable.set()
+        return article